@@ -0,0 +1,42 @@
+"""add book search vector
+
+Revision ID: 9a3f6c2e8d17
+Revises: 5c0e7a9d41b2
+Create Date: 2026-10-16 11:03:27.604912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f6c2e8d17'
+down_revision: Union[str, None] = '5c0e7a9d41b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Weighted document used by GET /books/search: title (A), author (B), publisher (C).
+    # Kept in sync with SEARCH_CONFIG and the weights in src/books/search.py.
+    op.add_column('books', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_books_search_vector', 'books', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
@@ -0,0 +1,51 @@
+"""add book rating aggregates
+
+Revision ID: c41d8e2b7a95
+Revises: 9a3f6c2e8d17
+Create Date: 2026-10-16 13:47:09.381256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8e2b7a95'
+down_revision: Union[str, None] = '9a3f6c2e8d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('review_count', sa.INTEGER(),
+                  server_default=sa.text('0'), nullable=False))
+    op.add_column('books', sa.Column('rating_sum', sa.INTEGER(),
+                  server_default=sa.text('0'), nullable=False))
+
+    # Backfill from the existing reviews
+    op.execute("""
+        UPDATE books
+        SET review_count = agg.review_count, rating_sum = agg.rating_sum
+        FROM (
+            SELECT book_uid, count(*) AS review_count, sum(rating) AS rating_sum
+            FROM reviews
+            WHERE book_uid IS NOT NULL
+            GROUP BY book_uid
+        ) AS agg
+        WHERE books.uid = agg.book_uid
+    """)
+
+    op.create_index('ix_books_top_rated', 'books', [
+        sa.text('(CAST(rating_sum AS FLOAT) / review_count) DESC'),
+        sa.text('review_count DESC'),
+        sa.text('uid DESC'),
+    ], unique=False, postgresql_where=sa.text('review_count > 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_top_rated', table_name='books')
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
@@ -0,0 +1,31 @@
+"""add tag name trigram index
+
+Revision ID: d8a6c3f15e40
+Revises: b5d03f8e6a29
+Create Date: 2026-10-17 01:02:54.861137
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a6c3f15e40'
+down_revision: Union[str, None] = 'b5d03f8e6a29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves the infix (ILIKE '%q%') fallback of GET /tags/autocomplete. Not mapped on
+    # `Tag` because trigram indexes only exist on PostgreSQL.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_tags_name_trgm', 'tags', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tags_name_trgm', table_name='tags', postgresql_using='gin')
@@ -0,0 +1,91 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+The scripts import the application from src/ and, unless given a database URL, seed
+a fresh SQLite database in a temporary directory. Application settings are read
+from the environment at import time, so call `configure` before importing anything
+from src/.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--database-url",
+        help="Empty database to seed; a temporary SQLite file by default.")
+    return parser
+
+
+def configure(database_url: str = None) -> str:
+    """Point the application at the benchmark database and make src/ importable."""
+    if database_url is None:
+        directory = tempfile.mkdtemp(prefix="bookly-bench-")
+        database_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    # Nothing is sent to Redis: the benchmarks never start the broadcast listeners
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    sys.path.insert(0, str(SRC))
+    return database_url
+
+
+async def create_schema() -> None:
+    """Create the tables, refusing to seed a database that already holds books."""
+    from sqlalchemy import func
+    from sqlmodel import SQLModel, select
+    from conf.database import async_engine, async_session
+    # Register every model so the mappers and foreign keys resolve
+    import auth.models  # noqa: F401
+    import reviews.models  # noqa: F401
+    import tags.models  # noqa: F401
+    from books.models import Book
+
+    # The application engine echoes every statement
+    async_engine.sync_engine.echo = False
+    async with async_engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with async_session() as session:
+        count = (await session.exec(select(func.count()).select_from(Book))).one()
+    if count:
+        raise SystemExit(f"The benchmark database already holds {count} books; use an empty one.")
+
+
+def book_rows(count: int, start: datetime = datetime(2026, 1, 1)) -> List[Dict[str, Any]]:
+    """Rows for the books table, created a second apart, oldest first."""
+    return [
+        dict(
+            uid=uuid.uuid4(), title=f"Title {i}", author="Some Author", publisher="Publisher",
+            published_date=date(2020, 1, 1), page_count=300, language="en",
+            review_count=i % 7, rating_sum=(i % 7) * 4, version=1,
+            created_at=start + timedelta(seconds=i), updated_at=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def per_call(function: Callable[[], Any], number: int) -> float:
+    """Average seconds per call of `function` over `number` calls."""
+    started = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - started) / number
+
+
+async def per_await(function: Callable[[], Any], number: int) -> float:
+    """Average seconds per awaited call of `function` over `number` calls."""
+    started = time.perf_counter()
+    for _ in range(number):
+        await function()
+    return (time.perf_counter() - started) / number
@@ -0,0 +1,102 @@
+"""
+Benchmark tag AND/NOT book queries: the pure-SQL baseline (one EXISTS or NOT EXISTS
+per tag, newest first), the /books/by-tags service path and the in-memory index alone.
+
+Tags are assigned with a Zipf-like popularity, so queries mix dense and sparse tags.
+
+    python scripts/bench_book_tag_index.py --books 200000
+"""
+import asyncio
+import random
+import time
+
+import _bench
+
+
+async def main(args) -> None:
+    await _bench.create_schema()
+    import numpy as np
+    from sqlalchemy import exists, insert
+    from sqlmodel import desc, select
+    from conf.database import async_session
+    from books.models import Book, BookTag, Tag
+    from books.services import BOOK_ROW_COLUMNS, BookService
+    from books.tag_index import book_tag_index
+
+    rng = random.Random(args.seed)
+    books = _bench.book_rows(args.books)
+    tags = [dict(uid=row["uid"], name=f"t{i}", created_at=row["created_at"], updated_at=row["updated_at"])
+            for i, row in enumerate(_bench.book_rows(args.tags))]
+    popularity = 1 / np.arange(1, args.tags + 1) ** 0.8
+    popularity = np.minimum(0.9, popularity / popularity.sum() * args.tags * 0.04)
+    links = [{"book_id": book["uid"], "tag_id": tag["uid"]}
+             for book in books for tag, p in zip(tags, popularity) if rng.random() < p]
+
+    async with async_session() as session:
+        for start in range(0, len(books), 5000):
+            await session.execute(insert(Book.__table__), books[start:start + 5000])
+        await session.execute(insert(Tag.__table__), tags)
+        for start in range(0, len(links), 20000):
+            await session.execute(insert(BookTag.__table__), links[start:start + 20000])
+        await session.commit()
+    print(f"{len(books)} books, {len(tags)} tags, {len(links)} links")
+
+    service = BookService()
+    uids = {tag["name"]: tag["uid"] for tag in tags}
+    async with async_session() as session:
+        started = time.perf_counter()
+        await book_tag_index.ensure_loaded(session)
+        print(f"index load {time.perf_counter() - started:.2f} s")
+
+        for required, excluded in args.queries:
+            required_uids = [uids[name] for name in required]
+            excluded_uids = [uids[name] for name in excluded]
+            baseline = (
+                select(*BOOK_ROW_COLUMNS)
+                .where(*(exists().where(BookTag.book_id == Book.uid, BookTag.tag_id == uid)
+                         for uid in required_uids))
+                .where(*(~exists().where(BookTag.book_id == Book.uid, BookTag.tag_id == uid)
+                         for uid in excluded_uids))
+                .order_by(desc(Book.created_at), desc(Book.uid))
+                .limit(args.limit + 1)
+            )
+
+            async def sql():
+                return (await session.exec(baseline)).all()
+
+            async def endpoint():
+                return await service.get_books_by_tags(required, excluded, session, args.limit)
+
+            sql_rows = await sql()
+            items, _, total = await endpoint()
+            if [row[0] for row in sql_rows[:args.limit]] != [item["uid"] for item in items]:
+                raise SystemExit(f"{required} - {excluded}: the index and SQL disagree")
+
+            sql_seconds = await _bench.per_await(sql, args.repeat)
+            endpoint_seconds = await _bench.per_await(endpoint, args.repeat)
+            index_seconds = _bench.per_call(
+                lambda: book_tag_index.query(required_uids, excluded_uids, args.limit + 1), 200)
+            query = "&".join(required) + "".join(f"-{name}" for name in excluded)
+            print(f"{query:<14} ({total:>6} hits): sql {sql_seconds * 1e3:7.1f} ms, "
+                  f"endpoint {endpoint_seconds * 1e3:5.1f} ms, index {index_seconds * 1e6:5.0f} us")
+
+
+def query(text: str):
+    """Parse `A&B-C` into required and excluded tag names."""
+    required, *excluded = text.split("-")
+    return required.split("&"), excluded
+
+
+if __name__ == "__main__":
+    parser = _bench.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=200000, help="Books to seed.")
+    parser.add_argument("--tags", type=int, default=60, help="Tags to seed, t0 the most used.")
+    parser.add_argument("--limit", type=int, default=20, help="Page size.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each database query.")
+    parser.add_argument("--seed", type=int, default=2, help="Random seed for the links.")
+    parser.add_argument("--queries", type=query, nargs="+",
+                        default=[query("t0&t1-t2"), query("t3&t10"), query("t0-t1-t5"), query("t20&t30-t0")],
+                        help="Queries as A&B-C: every tag joined by & and none prefixed with -.")
+    args = parser.parse_args()
+    _bench.configure(args.database_url)
+    asyncio.run(main(args))
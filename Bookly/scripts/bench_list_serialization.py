@@ -0,0 +1,71 @@
+"""
+Benchmark the book list: ORM instances serialized through the response model, as
+before plain rows, against plain rows encoded with orjson, as served now.
+
+Both sides fetch and encode the same page, newest first.
+
+    python scripts/bench_list_serialization.py --books 20000
+"""
+import asyncio
+import json
+
+import _bench
+
+
+async def main(args) -> None:
+    await _bench.create_schema()
+    from fastapi.responses import ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from sqlalchemy import insert
+    from sqlmodel import desc, select
+    from conf.database import async_session
+    from books.loading import book_load_options
+    from books.models import Book
+    from books.schemas import BookPageModel
+    from books.services import BookService
+
+    async with async_session() as session:
+        await session.execute(insert(Book.__table__), _bench.book_rows(args.books))
+        await session.commit()
+
+    field = create_model_field(name="response", type_=BookPageModel, mode="serialization")
+    service = BookService()
+
+    async def orm_page(session, limit):
+        statement = (
+            select(Book).options(*book_load_options("list"))
+            .order_by(desc(Book.created_at), desc(Book.uid)).limit(limit + 1)
+        )
+        items = (await session.exec(statement)).all()[:limit]
+        content = await serialize_response(
+            field=field, response_content={"items": items, "next_cursor": None}, is_coroutine=True)
+        session.expunge_all()
+        return json.dumps(content).encode()
+
+    async def row_page(session, limit):
+        items, next_cursor = await service.get_all_books(session, limit)
+        return ORJSONResponse({"items": items, "next_cursor": next_cursor}).body
+
+    async with async_session() as session:
+        # The ORM side leaves next_cursor out
+        same = (json.loads(await orm_page(session, 50))["items"]
+                == json.loads(await row_page(session, 50))["items"])
+        print(f"identical items: {same}")
+        for limit in args.limits:
+            number = max(2, 4000 // limit)
+            orm = await _bench.per_await(lambda: orm_page(session, limit), number)
+            rows = await _bench.per_await(lambda: row_page(session, limit), number)
+            print(
+                f"limit={limit}: ORM+response_model {limit / orm:,.0f} rows/s, "
+                f"rows+orjson {limit / rows:,.0f} rows/s ({orm / rows:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = _bench.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=20000, help="Books to seed.")
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 5000],
+                        help="Page sizes to measure.")
+    args = parser.parse_args()
+    _bench.configure(args.database_url)
+    asyncio.run(main(args))
@@ -0,0 +1,53 @@
+"""
+Benchmark the negotiated response formats: payload size, encode and decode time of
+JSON (orjson) against MessagePack, for a page of books and a large review listing.
+
+    python scripts/bench_negotiation.py
+"""
+import argparse
+import json
+import uuid
+from datetime import datetime
+
+import _bench
+
+
+def main(args) -> None:
+    import msgpack
+    import orjson
+    from conf.negotiation import packb
+    from books.services import book_row
+
+    books = [book_row(row) for row in _bench.book_rows(args.books)]
+    for row in books:
+        del row["version"]
+    reviews = [
+        dict(uid=uuid.uuid4(), rating=i % 5 + 1, review_text="A thoughtful and fairly long review text " * 3,
+             user_uid=uuid.uuid4(), book_uid=uuid.uuid4(),
+             created_at=datetime(2026, 1, 1, 12, 0, i % 60, i), updated_at=datetime(2026, 1, 1, 12, 0, i % 60, i))
+        for i in range(args.reviews)
+    ]
+
+    for name, content, rows in [("books page", {"items": books, "next_cursor": None}, len(books)),
+                                ("reviews", reviews, len(reviews))]:
+        number = max(5, 20000 // rows)
+        json_body = orjson.dumps(content)
+        msgpack_body = packb(content)
+        # What a validated response model hands the encoder
+        ready = json.loads(json_body)
+        print(
+            f"{name} ({rows} rows):\n"
+            f"  json     {len(json_body):>9,} B  encode {_bench.per_call(lambda: orjson.dumps(content), number) * 1e3:.3f} ms"
+            f"  decode {_bench.per_call(lambda: orjson.loads(json_body), number) * 1e3:.3f} ms\n"
+            f"  msgpack  {len(msgpack_body):>9,} B  encode {_bench.per_call(lambda: packb(content), number) * 1e3:.3f} ms"
+            f" (JSON-ready {_bench.per_call(lambda: msgpack.packb(ready), number) * 1e3:.3f} ms)"
+            f"  decode {_bench.per_call(lambda: msgpack.unpackb(msgpack_body), number) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=100, help="Books on the page.")
+    parser.add_argument("--reviews", type=int, default=5000, help="Reviews in the listing.")
+    args = parser.parse_args()
+    _bench.configure()
+    main(args)
@@ -0,0 +1,36 @@
+"""
+Benchmark decode_token with the token caches against verifying every token, for a
+valid token and for one with a bad signature.
+
+    python scripts/bench_token_cache.py --calls 100000
+"""
+import argparse
+import logging
+import uuid
+
+import _bench
+
+
+def main(args) -> None:
+    from auth.utils import _verify_token, create_access_token, decode_token, token_cache_stats
+
+    # Rejections are logged on every uncached verification; time the verification only
+    logging.disable(logging.CRITICAL)
+    valid = create_access_token({"user_uid": str(uuid.uuid4()), "email": "reader@example.com", "role": "user"})
+    invalid = valid[:-2] + ("A" if valid[-2] != "A" else "B") + valid[-1]
+    assert decode_token(valid) is not None and decode_token(invalid) is None
+
+    for name, token in (("valid", valid), ("invalid", invalid)):
+        uncached = _bench.per_call(lambda: _verify_token(token), args.calls // 10)
+        cached = _bench.per_call(lambda: decode_token(token), args.calls)
+        print(f"{name:<8} uncached {1 / uncached:>10,.0f}/s, cached {1 / cached:>10,.0f}/s "
+              f"({uncached / cached:.0f}x)")
+    print(token_cache_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000, help="Cached calls per token.")
+    args = parser.parse_args()
+    _bench.configure()
+    main(args)
@@ -4,8 +4,8 @@ from fastapi.exceptions import HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel.ext.asyncio.session import AsyncSession
 from conf.database import get_db
-from .models import User
-from conf.redis import token_in_blocklist
+from conf.blocklist import token_in_blocklist
+from .schemas import Principal
 from .services import AuthService
 from .utils import decode_token
 
@@ -92,22 +92,22 @@ class RefreshTokenBearer(TokenBearer):
 
 
 async def get_current_user(
-    token_details: dict = Depends(AccessTokenBearer),
+    token_details: dict = Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
     """
-    Retrieve the current authenticated user based on the access token.
+    Retrieve the principal (uid, email, role, verification) of the authenticated user.
     """
-    user_email = token_details["user"]["email"]
+    user_uid = token_details["user"]["user_uid"]
 
-    user = await auth_service.get_user_by_email(user_email, session)
-    if not user:
+    principal = await auth_service.get_principal(user_uid, session)
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found.",
         )
 
-    return user
+    return principal
 
 
 class RoleChecker:
@@ -118,7 +118,7 @@ class RoleChecker:
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> bool:
+    def __call__(self, current_user: Principal = Depends(get_current_user)) -> bool:
         """
         Ensure the current user is verified and has an allowed role.
         """
@@ -29,12 +29,13 @@ class User(SQLModel, table=True):
     updated_at: datetime = Field(sa_column=Column(
         pg.TIMESTAMP, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow))
 
-    # Relationships
+    # Relationships are never loaded implicitly; a user's books and reviews
+    # must be requested explicitly by the query that needs them.
     books: List["Book"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     reviews: List["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,132 @@
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+from redis.exceptions import RedisError
+from conf.broadcast import Broadcast
+from conf.cache import MISSING, LRUCache
+from conf.config import settings
+from conf.metrics import register_metrics
+from conf.redis import redis_client
+from .schemas import Principal
+
+# Cached principal with the user's version at the time it was read
+PRINCIPAL_KEY = "principal:{}"
+# Per-user counter bumped by every change to the user
+PRINCIPAL_VERSION_KEY = "principal:version:{}"
+# Channel on which user updates tell every worker to drop its local copy
+INVALIDATION_CHANNEL = "principal:invalidate"
+
+
+class PrincipalCache:
+    """
+    Principals of authenticated users: an in-process LRU in front of Redis.
+
+    Each user has a version counter in Redis that `invalidate` bumps. A principal is
+    stored in Redis with the version read before it was loaded, and a Redis entry
+    whose version is no longer current is a miss, so a load that raced an update
+    can't republish the old row. `invalidate` also tells every worker to drop its
+    local copy; local copies are trusted without checking the version, for at most
+    `ttl` seconds, which bounds staleness if that message is lost. Redis entries
+    expire after `redis_ttl` seconds, which bounds staleness if `invalidate` can't
+    reach Redis.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, redis_ttl: int, client=redis_client) -> None:
+        self.local = LRUCache(maxsize, ttl)
+        self.redis_ttl = redis_ttl
+        self.client = client
+        self.broadcast = Broadcast(
+            INVALIDATION_CHANNEL,
+            on_message=self.local.pop,
+            # Invalidations published while unsubscribed were missed
+            on_reset=self.local.clear,
+            max_backoff=ttl,
+            client=client,
+        )
+        self.redis_hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    async def get(self, user_uid) -> Tuple[Optional[Principal], Optional[int]]:
+        """
+        Return the cached principal, or None on a miss, with the user's current
+        version to store a freshly loaded principal under (None if Redis failed).
+        """
+        key = str(user_uid)
+        principal = self.local.get(key)
+        if principal is not MISSING:
+            return principal, None
+
+        try:
+            raw, version = await self.client.mget(
+                PRINCIPAL_KEY.format(key), PRINCIPAL_VERSION_KEY.format(key))
+        except RedisError as e:
+            logging.warning(f"Principal cache read failed for {key}: {e}")
+            self.misses += 1
+            return None, None
+
+        version = int(version or 0)
+        if raw is not None:
+            entry = json.loads(raw)
+            if entry["version"] == version:
+                principal = Principal(**entry["principal"])
+                self.redis_hits += 1
+                self.local.set(key, principal)
+                return principal, version
+            self.stale += 1
+        self.misses += 1
+        return None, version
+
+    async def set(self, principal: Principal, version: Optional[int]) -> None:
+        """Store a principal loaded after `get` returned `version`."""
+        key = str(principal.uid)
+        self.local.set(key, principal)
+        if version is None:
+            return
+        entry = json.dumps({"principal": principal.model_dump(mode="json"), "version": version})
+        try:
+            await self.client.set(PRINCIPAL_KEY.format(key), entry, ex=self.redis_ttl)
+        except RedisError as e:
+            logging.warning(f"Principal cache write failed for {key}: {e}")
+
+    async def invalidate(self, user_uid) -> None:
+        """Bump the user's version and drop the principal from every worker."""
+        key = str(user_uid)
+        self.local.pop(key)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(PRINCIPAL_VERSION_KEY.format(key))
+                pipe.delete(PRINCIPAL_KEY.format(key))
+                await pipe.execute()
+        except RedisError as e:
+            logging.warning(
+                f"Principal cache invalidation failed for {key}, the cached principal "
+                f"may be served for up to {self.redis_ttl} s: {e}")
+        await self.broadcast.publish(key)
+
+    async def start(self) -> None:
+        """Start listening for invalidations published by other workers."""
+        await self.broadcast.start()
+
+    async def stop(self) -> None:
+        await self.broadcast.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.local.hits + self.redis_hits + self.misses
+        return {
+            "local": self.local.stats(),
+            "redis_hits": self.redis_hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "hit_rate": round((self.local.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+            "subscribed": self.broadcast.subscribed,
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL,
+)
+register_metrics("principal_cache", principal_cache.stats)
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, status, BackgroundTasks, HTTPException
 from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from conf.database import get_db
-from conf.redis import add_jti_to_blocklist
+from conf.blocklist import add_jti_to_blocklist
 from conf.celery_tasks import send_email
 from conf.config import settings
 from .dependencies import (
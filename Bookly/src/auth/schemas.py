@@ -39,6 +39,16 @@ class UserModel(BaseModel):
         orm_mode = True
 
 
+class Principal(BaseModel):
+    """
+    The authenticated user as seen by permission checks: identity and role only.
+    """
+    uid: uuid.UUID
+    email: str
+    role: str
+    is_verified: bool
+
+
 class UserBooksModel(UserModel):
     books: List[Book]
     reviews: List[ReviewModel]
@@ -1,19 +1,43 @@
+from typing import Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .models import User
-from .schemas import UserCreateModel
+from .principals import principal_cache
+from .schemas import Principal, UserCreateModel
 from .utils import generate_password_hash
 
 class AuthService:
     async def get_user_by_email(self, email: str, session: AsyncSession):
         statement = select(User).where(User.email == email)
 
-        result = await session.execute(statement)
+        result = await session.exec(statement)
 
         user = result.first()
 
         return user
 
+    async def get_principal(self, user_uid: str, session: AsyncSession) -> Optional[Principal]:
+        """
+        Load only the columns needed to authorize a request, by primary key, read
+        through the principal cache.
+        """
+        principal, version = await principal_cache.get(user_uid)
+        if principal:
+            return principal
+
+        statement = select(User.uid, User.email, User.role, User.is_verified).where(
+            User.uid == user_uid)
+
+        result = await session.exec(statement)
+
+        row = result.first()
+        if not row:
+            return None
+
+        principal = Principal(**row._mapping)
+        await principal_cache.set(principal, version)
+        return principal
+
     async def user_exists(self, email, session: AsyncSession):
         user = await self.get_user_by_email(email, session)
 
@@ -40,11 +64,15 @@ class AuthService:
     async def update_user(self, user: User, user_data: dict, session: AsyncSession) -> User:
         """
         Update an existing user's attributes with the given data.
+
+        Bumps the user's principal version, so every worker stops serving the cached
+        role and verification status.
         """
         for key, value in user_data.items():
             setattr(user, key, value)
 
         await session.commit()
+        await principal_cache.invalidate(user.uid)
         await session.refresh(user)  # Refresh to get updated data.
 
         return user
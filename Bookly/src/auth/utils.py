@@ -1,11 +1,15 @@
+import hashlib
 import logging
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import jwt
 from passlib.context import CryptContext
 from itsdangerous import URLSafeTimedSerializer
+from conf.cache import MISSING, LRUCache
 from conf.config import settings
+from conf.metrics import register_metrics
 
 # Initialize password hashing context
 passwd_context = CryptContext(schemes=["bcrypt"])
@@ -13,6 +17,31 @@ passwd_context = CryptContext(schemes=["bcrypt"])
 # Constants
 ACCESS_TOKEN_EXPIRY_SECONDS = 3600  # 1 hour
 
+# Claims of verified tokens keyed by token digest, each kept until its token expires
+verified_token_cache = LRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRY_SECONDS)
+
+# Digests of tokens that failed verification, remembered briefly. Kept apart from
+# the verified claims so a flood of distinct bad tokens can't evict them.
+rejected_token_cache = LRUCache(
+    maxsize=settings.REJECTED_TOKEN_CACHE_SIZE, ttl=settings.REJECTED_TOKEN_CACHE_TTL)
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    """Return both token caches' counters and the share of tokens neither had to verify."""
+    verified = verified_token_cache.stats()
+    rejected = rejected_token_cache.stats()
+    # Every lookup goes through the verified cache first
+    lookups = verified["hits"] + verified["misses"]
+    return {
+        "verified": verified,
+        "rejected": rejected,
+        "hit_rate": round((verified["hits"] + rejected["hits"]) / lookups, 4) if lookups else 0.0,
+    }
+
+
+register_metrics("token_cache", token_cache_stats)
+
 
 def generate_password_hash(password: str) -> str:
     """
@@ -53,7 +82,30 @@ def create_access_token(
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Decode a JWT token to retrieve its payload.
+
+    A token presented again is answered from the token caches instead of being parsed
+    and its signature checked again. Cached payloads are shared, so callers must not
+    modify them.
     """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(key)
+    if payload is not MISSING:
+        return payload
+    if rejected_token_cache.get(key) is not MISSING:
+        return None
+
+    payload = _verify_token(token)
+    if payload is None:
+        rejected_token_cache.set(key, None)
+    elif "exp" not in payload:
+        verified_token_cache.set(key, payload)
+    elif payload["exp"] > time.time():
+        # Evicted at `exp`, when PyJWT would start rejecting the token
+        verified_token_cache.set(key, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
+def _verify_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         return jwt.decode(
             jwt=token,
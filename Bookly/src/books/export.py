@@ -0,0 +1,102 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List
+import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import func, select
+from conf.database import async_session
+from .models import Book, BookTag, Tag
+
+# Rows fetched from the server-side cursor per round trip and per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "uid",
+    "title",
+    "author",
+    "publisher",
+    "published_date",
+    "page_count",
+    "language",
+    "user_uid",
+    "review_count",
+    "rating_sum",
+    "created_at",
+    "updated_at",
+    "tags",
+]
+
+
+def _export_statement():
+    """
+    Build the export query: one row per book with its tag names and rating aggregates.
+
+    Tag names are aggregated once in a grouped subquery and joined, instead of
+    running a correlated subquery per book.
+    """
+    tag_names = (
+        select(
+            BookTag.book_id,
+            func.array_agg(Tag.name, type_=pg.ARRAY(pg.VARCHAR)).label("tags"),
+        )
+        .join(Tag, Tag.uid == BookTag.tag_id)
+        .group_by(BookTag.book_id)
+        .subquery()
+    )
+    book = Book.__table__
+    # Columns listed explicitly so that new internal columns stay out of the export
+    return (
+        select(*(book.c[name] for name in EXPORT_FIELDS if name != "tags"), tag_names.c.tags)
+        .outerjoin(tag_names, tag_names.c.book_id == book.c.uid)
+    )
+
+
+async def stream_book_rows() -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield the book catalog in batches read from a server-side cursor.
+
+    The generator owns its session because it outlives the request's dependencies.
+    It is only advanced when the previous chunk has been sent, so a slow client
+    slows down the cursor instead of filling memory, and a disconnect cancels it
+    and closes the cursor.
+    """
+    exported = 0
+    try:
+        async with async_session() as session:
+            result = await session.stream(
+                _export_statement().execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            async for partition in result.mappings().partitions():
+                batch = [dict(row) for row in partition]
+                exported += len(batch)
+                yield batch
+    except asyncio.CancelledError:
+        logging.info(f"Book export cancelled by client after {exported} rows")
+        raise
+    logging.info(f"Book export finished with {exported} rows")
+
+
+async def iter_ndjson() -> AsyncIterator[str]:
+    """Encode the export as newline-delimited JSON, one chunk per batch."""
+    async for batch in stream_book_rows():
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+async def iter_csv() -> AsyncIterator[str]:
+    """Encode the export as CSV, one chunk per batch; tag names are `|`-separated."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    async for batch in stream_book_rows():
+        for row in batch:
+            row["tags"] = "|".join(row["tags"] or [])
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
@@ -0,0 +1,174 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+from sqlalchemy import String, case, cast, distinct, exists, extract, func, literal, union_all
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import Book, BookTag, Tag
+from .schemas import BookFilterModel
+
+# Facet dimensions, in the order they are reported
+FACET_DIMENSIONS = ["language", "publisher", "published_year", "page_count", "tag"]
+
+# Page count facet buckets as (label, lower bound, exclusive upper bound)
+PAGE_COUNT_BUCKETS = [
+    ("0-99", 0, 100),
+    ("100-199", 100, 200),
+    ("200-399", 200, 400),
+    ("400-699", 400, 700),
+    ("700+", 700, None),
+]
+
+# Most values reported per dimension, by descending count
+FACET_VALUE_LIMIT = 20
+
+
+def filter_conditions(filters: BookFilterModel) -> list:
+    """
+    Translate the filters into WHERE conditions on `books`.
+
+    Each condition is served by one of the filter indexes; the tag filter is a
+    semi-join through the (tag_id, book_id) index on book_tags.
+    """
+    conditions = []
+    if filters.language is not None:
+        conditions.append(Book.language == filters.language)
+    if filters.publisher is not None:
+        conditions.append(Book.publisher == filters.publisher)
+    if filters.published_from is not None:
+        conditions.append(Book.published_date >= filters.published_from)
+    if filters.published_to is not None:
+        conditions.append(Book.published_date <= filters.published_to)
+    if filters.min_pages is not None:
+        conditions.append(Book.page_count >= filters.min_pages)
+    if filters.max_pages is not None:
+        conditions.append(Book.page_count <= filters.max_pages)
+    if filters.tag is not None:
+        conditions.append(exists(
+            select(BookTag.book_id)
+            .join(Tag, Tag.uid == BookTag.tag_id)
+            .where(BookTag.book_id == Book.uid, Tag.name == filters.tag)
+        ))
+    return conditions
+
+
+def facet_cache_key(filters: BookFilterModel) -> str:
+    """Stable key for a filter combination; unset filters are left out."""
+    canonical = json.dumps(filters.model_dump(mode="json", exclude_none=True), sort_keys=True)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def _page_count_bucket():
+    return case(
+        *((Book.page_count < upper, literal(label))
+          for label, _, upper in PAGE_COUNT_BUCKETS if upper is not None),
+        else_=literal(PAGE_COUNT_BUCKETS[-1][0]),
+    )
+
+
+def _grouping_sets_statement(conditions: list):
+    # One row per (book, tag); untagged books keep a NULL tag
+    rows = (
+        select(
+            Book.uid.label("uid"),
+            Book.language.label("language"),
+            Book.publisher.label("publisher"),
+            extract("year", Book.published_date).label("published_year"),
+            _page_count_bucket().label("page_count"),
+            Tag.name.label("tag"),
+        )
+        .outerjoin(BookTag, BookTag.book_id == Book.uid)
+        .outerjoin(Tag, Tag.uid == BookTag.tag_id)
+        .where(*conditions)
+        .subquery()
+    )
+    columns = [rows.c[dimension] for dimension in FACET_DIMENSIONS]
+    # grouping() is 0 for the column a row is grouped by
+    grouped_by = [func.grouping(column) == 0 for column in columns]
+    return (
+        select(
+            case(*((grouped, literal(dimension)) for grouped, dimension in zip(grouped_by, FACET_DIMENSIONS)))
+            .label("dimension"),
+            case(*((grouped, cast(column, String)) for grouped, column in zip(grouped_by, columns)))
+            .label("value"),
+            # The tag join repeats each book once per tag
+            func.count(distinct(rows.c.uid)).label("count"),
+        )
+        .group_by(func.grouping_sets(*columns))
+    )
+
+
+def _union_statement(conditions: list):
+    expressions = {
+        "language": Book.language,
+        "publisher": Book.publisher,
+        "published_year": extract("year", Book.published_date),
+        "page_count": _page_count_bucket(),
+    }
+    selects = [
+        select(
+            literal(dimension).label("dimension"),
+            cast(expression, String).label("value"),
+            func.count().label("count"),
+        )
+        .where(*conditions)
+        .group_by(expression)
+        for dimension, expression in expressions.items()
+    ]
+    selects.append(
+        select(literal("tag"), Tag.name, func.count())
+        .select_from(Book)
+        .join(BookTag, BookTag.book_id == Book.uid)
+        .join(Tag, Tag.uid == BookTag.tag_id)
+        .where(*conditions)
+        .group_by(Tag.name)
+    )
+    return union_all(*selects)
+
+
+def _top_values(statement):
+    """
+    Keep the `FACET_VALUE_LIMIT` values with the highest counts per dimension, ranked
+    in the database so the other values are never sent back.
+    """
+    counted = statement.subquery()
+    ranked = (
+        select(
+            counted.c.dimension,
+            counted.c.value,
+            counted.c.count,
+            func.row_number().over(
+                partition_by=counted.c.dimension,
+                order_by=(counted.c.count.desc(), counted.c.value),
+            ).label("rank"),
+        )
+        .where(counted.c.value.is_not(None))
+        .subquery()
+    )
+    return (
+        select(ranked.c.dimension, ranked.c.value, ranked.c.count)
+        .where(ranked.c.rank <= FACET_VALUE_LIMIT)
+        .order_by(ranked.c.dimension, ranked.c.rank)
+    )
+
+
+async def count_facets(filters: BookFilterModel, session: AsyncSession) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Count the books matching the filters per value of every facet dimension.
+
+    On PostgreSQL this is one pass over the matching rows grouped by GROUPING SETS;
+    other databases run the same groupings as one UNION ALL query. Either way only
+    the top `FACET_VALUE_LIMIT` values per dimension are returned by the database.
+    Counts are conjunctive: every filter, including the dimension's own, applies.
+    """
+    conditions = filter_conditions(filters)
+    if session.bind.dialect.name == "postgresql":
+        statement = _grouping_sets_statement(conditions)
+    else:
+        statement = _union_statement(conditions)
+
+    facets: Dict[str, List[Dict[str, Any]]] = {dimension: [] for dimension in FACET_DIMENSIONS}
+    result = await session.exec(_top_values(statement))
+    for dimension, value, count in result.all():
+        facets[dimension].append({"value": value, "count": count})
+    return facets
@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from .models import Book
+from .schemas import BookCreateModel, ExportFormat
+from .search import book_search_index
+
+# Rows validated and written per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Column order used for both multi-row INSERT and COPY
+IMPORT_COLUMNS = [
+    "uid",
+    "title",
+    "author",
+    "publisher",
+    "published_date",
+    "page_count",
+    "language",
+    "user_uid",
+    "created_at",
+    "updated_at",
+]
+
+
+def iter_records(stream: TextIO, format: ExportFormat) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield `(line_number, record)` pairs from an NDJSON or CSV upload.
+
+    NDJSON records are yielded as raw lines and parsed during validation, so a
+    malformed line is reported as a rejected row instead of aborting the import.
+    """
+    if format == ExportFormat.csv:
+        # Line 1 is the header row
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+class BookImporter:
+    """
+    Validate book records in chunks and write each chunk in a single statement.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_uid: str,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.session = session
+        self.user_uid = uuid.UUID(str(user_uid))
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+
+    async def run(self, records: Iterator[Tuple[int, Any]]) -> Dict[str, Any]:
+        """
+        Import every record, committing once per batch, and return the import report.
+        """
+        started = time.perf_counter()
+        report = {"total_rows": 0, "inserted": 0, "rejected": [], "batches": 0}
+
+        while True:
+            # Reading and validating is CPU-bound, so keep it off the event loop
+            chunk = await run_in_threadpool(self._next_chunk, records)
+            if not chunk:
+                break
+
+            rows, rejected = chunk
+            if rows:
+                await self._write_batch(rows)
+                await self.session.commit()
+                for row in rows:
+                    book_search_index.add(
+                        row["uid"], row["title"], row["author"], row["publisher"])
+
+            report["total_rows"] += len(rows) + len(rejected)
+            report["inserted"] += len(rows)
+            report["rejected"].extend(rejected)
+            report["batches"] += 1
+
+            elapsed = time.perf_counter() - started
+            progress = {
+                "batches": report["batches"],
+                "total_rows": report["total_rows"],
+                "inserted": report["inserted"],
+                "rejected": len(report["rejected"]),
+                "rows_per_second": round(report["total_rows"] / elapsed, 1) if elapsed else 0.0,
+            }
+            logging.info(f"Book import progress: {progress}")
+            if self.on_progress:
+                self.on_progress(progress)
+
+        elapsed = time.perf_counter() - started
+        report["elapsed_seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(
+            report["total_rows"] / elapsed, 1) if elapsed else 0.0
+        return report
+
+    def _next_chunk(self, records: Iterator[Tuple[int, Any]]):
+        """
+        Validate the next `batch_size` records against `BookCreateModel`.
+
+        Returns `(rows, rejected)`, or None when the input is exhausted.
+        """
+        records = list(islice(records, self.batch_size))
+        if not records:
+            return None
+
+        now = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        rejected: List[Dict[str, Any]] = []
+
+        for line_number, record in records:
+            try:
+                if isinstance(record, str):
+                    book = BookCreateModel.model_validate_json(record)
+                else:
+                    book = BookCreateModel.model_validate(record)
+            except ValidationError as e:
+                rejected.append({
+                    "line": line_number,
+                    "errors": [
+                        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                        for error in e.errors()
+                    ],
+                })
+                continue
+
+            rows.append({
+                "uid": uuid.uuid4(),
+                **book.model_dump(),
+                "user_uid": self.user_uid,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        return rows, rejected
+
+    async def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch with COPY on PostgreSQL, otherwise with a multi-row INSERT.
+        """
+        if self.session.bind.dialect.name == "postgresql":
+            connection = await self.session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Book.__tablename__,
+                records=[tuple(row[column] for column in IMPORT_COLUMNS)
+                         for row in rows],
+                columns=IMPORT_COLUMNS,
+            )
+        else:
+            await self.session.execute(insert(Book.__table__), rows)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from conf.database import async_session
+    # Register the related models so the Book mapper can be configured
+    import auth.models  # noqa: F401
+    import reviews.models  # noqa: F401
+
+    format = args.format or (
+        ExportFormat.csv if args.path.endswith(".csv") else ExportFormat.ndjson)
+
+    def print_progress(progress: Dict[str, Any]) -> None:
+        print(
+            f"batch {progress['batches']}: {progress['inserted']} inserted, "
+            f"{progress['rejected']} rejected, {progress['rows_per_second']} rows/s",
+            file=sys.stderr,
+        )
+
+    with open(args.path, encoding="utf-8", newline="") as stream:
+        async with async_session() as session:
+            importer = BookImporter(
+                session, args.user_uid, args.batch_size, on_progress=print_progress)
+            report = await importer.run(iter_records(stream, format))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bulk import books from an NDJSON or CSV file.")
+    parser.add_argument("path", help="Path to the NDJSON or CSV file.")
+    parser.add_argument("--user-uid", required=True,
+                        help="UID of the user the books are submitted by.")
+    parser.add_argument("--format", type=ExportFormat, choices=[f.value for f in ExportFormat],
+                        help="File format; inferred from the extension by default.")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                        help="Rows per batch and per commit.")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,46 @@
+from typing import Callable, Dict
+from sqlalchemy.orm import raiseload, selectinload
+from .models import Book
+
+
+def _no_relations():
+    # Relationships not named by a profile raise instead of emitting SQL on access.
+    # `sql_only` still allows many-to-one lookups already in the identity map.
+    return raiseload("*", sql_only=True)
+
+
+# Profiles are built on use: creating the options configures the mappers, which
+# needs every related model to have been imported first.
+BOOK_LOAD_PROFILES: Dict[str, Callable[[], tuple]] = {
+    # Columns only: a page of books is exactly one query
+    "list": lambda: (_no_relations(),),
+    # Reviews and tags for the detail view, without their own relationships
+    "detail": lambda: (
+        selectinload(Book.reviews).raiseload("*", sql_only=True),
+        selectinload(Book.tags).raiseload("*", sql_only=True),
+        _no_relations(),
+    ),
+    # Tags only, for changing a book's tag links
+    "tags": lambda: (
+        selectinload(Book.tags).raiseload("*", sql_only=True),
+        _no_relations(),
+    ),
+}
+
+TAG_LOAD_PROFILES: Dict[str, Callable[[], tuple]] = {
+    "list": lambda: (_no_relations(),),
+}
+
+
+def book_load_options(profile: str = "list") -> tuple:
+    """
+    Return the loader options for a named book load profile.
+    """
+    return BOOK_LOAD_PROFILES[profile]()
+
+
+def tag_load_options(profile: str = "list") -> tuple:
+    """
+    Return the loader options for a named tag load profile.
+    """
+    return TAG_LOAD_PROFILES[profile]()
@@ -2,6 +2,7 @@ from typing import List, Optional, TYPE_CHECKING
 from datetime import datetime, date
 import uuid
 import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import Float, Index, cast, text
 from sqlmodel import Column, Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -11,20 +12,33 @@ if TYPE_CHECKING:
 
 class BookTag(SQLModel, table=True):
     __tablename__ = "book_tags"
+    __table_args__ = (
+        # The primary key serves lookups by book; this one serves lookups by tag
+        Index("ix_book_tags_tag_id_book_id", "tag_id", "book_id"),
+    )
 
-    # Composite primary key: book_id and tag_id
+    # Composite primary key: book_id and tag_id. Links go away with either side.
     book_id: uuid.UUID = Field(
-        default=None, foreign_key="books.uid", primary_key=True)
+        default=None, foreign_key="books.uid", primary_key=True, ondelete="CASCADE")
     tag_id: uuid.UUID = Field(
-        default=None, foreign_key="tags.uid", primary_key=True)
-
-    # Relationships
-    book: "Book" = Relationship(back_populates="tags")
-    tag: "Tag" = Relationship(back_populates="books")
+        default=None, foreign_key="tags.uid", primary_key=True, ondelete="CASCADE")
 
 
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        # Keyset pagination indexes for the book listings
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_user_uid_created_at_uid",
+              "user_uid", "created_at", "uid"),
+        # Faceted filtering: equality filters keep the listing order, ranges stand alone
+        Index("ix_books_language_created_at_uid",
+              "language", "created_at", "uid"),
+        Index("ix_books_publisher_created_at_uid",
+              "publisher", "created_at", "uid"),
+        Index("ix_books_published_date", "published_date"),
+        Index("ix_books_page_count", "page_count"),
+    )
 
     uid: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
@@ -35,38 +49,73 @@ class Book(SQLModel, table=True):
     language: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
     user_uid: Optional[uuid.UUID] = Field(
         default=None, foreign_key="users.uid")
+    # Rating aggregates, maintained by ReviewService in the review's transaction
+    review_count: int = Field(default=0, sa_column=Column(
+        pg.INTEGER, nullable=False, server_default=text("0")))
+    rating_sum: int = Field(default=0, sa_column=Column(
+        pg.INTEGER, nullable=False, server_default=text("0")))
+    # Bumped by every write that changes the book's detail payload (its fields,
+    # reviews or tags); the detail endpoint derives its ETag from it
+    version: int = Field(default=1, sa_column=Column(
+        pg.INTEGER, nullable=False, server_default=text("1")))
     created_at: datetime = Field(
         default_factory=datetime.utcnow, sa_column=Column(pg.TIMESTAMP))
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(
         pg.TIMESTAMP, onupdate=datetime.utcnow))
 
-    # Relationships
+    # Relationships are never loaded implicitly; services pick a load profile
+    # from books/loading.py for each query.
     user: Optional["User"] = Relationship(
-        back_populates="books", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="books", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     reviews: List["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     tags: List["Tag"] = Relationship(
-        link_model=BookTag, back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        link_model=BookTag, back_populates="books", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
 
+    @property
+    def average_rating(self) -> Optional[float]:
+        return self.rating_sum / self.review_count if self.review_count else None
+
     def __repr__(self) -> str:
         return f"<Book {self.title}>"
 
 
+# Average rating computed from the aggregates. The top-rated query must order by this
+# exact expression for PostgreSQL to serve it from ix_books_top_rated.
+book_average_rating = cast(Book.__table__.c.rating_sum, Float).op(
+    "/", return_type=Float)(Book.__table__.c.review_count)
+
+Index(
+    "ix_books_top_rated",
+    book_average_rating.desc(),
+    Book.__table__.c.review_count.desc(),
+    Book.__table__.c.uid.desc(),
+    postgresql_where=Book.__table__.c.review_count > 0,
+    sqlite_where=Book.__table__.c.review_count > 0,
+)
+
+
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (
+        # max(updated_at) is half of the tag list's ETag
+        Index("ix_tags_updated_at", "updated_at"),
+    )
 
     uid: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str = Field(sa_column=Column(
         pg.VARCHAR, nullable=False, unique=True))
     created_at: datetime = Field(
         default_factory=datetime.utcnow, sa_column=Column(pg.TIMESTAMP))
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(
+        pg.TIMESTAMP, onupdate=datetime.utcnow))
 
     # Relationship: Many-to-many with Book via BookTag
     books: List["Book"] = Relationship(
-        link_model=BookTag, back_populates="tag", sa_relationship_kwargs={"lazy": "selectin"})
+        link_model=BookTag, back_populates="tags", sa_relationship_kwargs={"lazy": "raise_on_sql"})
 
     def __repr__(self) -> str:
         return f"<Tag {self.name}>"
@@ -1,42 +1,175 @@
-from typing import List
+import io
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, UploadFile, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from auth.dependencies import AccessTokenBearer, RoleChecker
-from .services import BookService
+from conf.etag import etag_matches, make_etag, not_modified
+from conf.negotiation import NegotiatedResponse, NegotiatedRoute
+from conf.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .export import iter_csv, iter_ndjson
+from .importer import BookImporter, iter_records
+from .services import BookService, book_etag
 from src.main import get_session
-from .schemas import Book, BookCreateModel, BookDetailModel, BookUpdateModel
+from reviews.schemas import RatingHistogramModel, ReviewExpansion, ReviewPageModel
+from reviews.services import ReviewService
+from .schemas import (
+    Book,
+    BookBulkUpdateItem,
+    BookBulkUpdateReport,
+    BookCreateModel,
+    BookDetailModel,
+    BookFacetPageModel,
+    BookFilterModel,
+    BookImportReport,
+    BookPageModel,
+    BookSearchPageModel,
+    BookTagPageModel,
+    BookUpdateModel,
+    ExportFormat,
+    TrendingBookModel,
+)
 
-book_router = APIRouter()
+book_router = APIRouter(
+    route_class=NegotiatedRoute, default_response_class=NegotiatedResponse)
 book_service = BookService()
+review_service = ReviewService()
 
 # Define common dependencies
 access_token_bearer = AccessTokenBearer()
 role_checker = Depends(RoleChecker(["admin", "user"]))
 
+# Most books a single bulk update may change
+BULK_UPDATE_LIMIT = 1000
+
 
-@book_router.get("/", response_model=List[Book], dependencies=[role_checker])
+@book_router.get("/", response_model=BookPageModel, dependencies=[role_checker])
 async def get_all_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(access_token_bearer),
 ):
-    """Fetch all books."""
-    books = await book_service.get_all_books(session)
-    return books
+    """Fetch a page of books; pass `next_cursor` back as `cursor` for the next page."""
+    books, next_cursor = await book_service.get_all_books(session, limit, cursor)
+    # Rows are already shaped like the response model, so skip validating them again
+    return NegotiatedResponse({"items": books, "next_cursor": next_cursor})
 
 
 @book_router.get(
-    "/user/{user_uid}", response_model=List[Book], dependencies=[role_checker]
+    "/user/{user_uid}", response_model=BookPageModel, dependencies=[role_checker]
 )
 async def get_user_book_submissions(
     user_uid: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Fetch a page of books submitted by a specific user."""
+    books, next_cursor = await book_service.get_user_books(
+        user_uid, session, limit, cursor)
+    return NegotiatedResponse({"items": books, "next_cursor": next_cursor})
+
+
+@book_router.get("/filter", response_model=BookFacetPageModel, dependencies=[role_checker])
+async def filter_books(
+    filters: BookFilterModel = Depends(),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """
+    Fetch a page of books matching the filters, with facet counts for language,
+    publisher, publication year, page count range and tag.
+    """
+    books, next_cursor = await book_service.filter_books(filters, session, limit, cursor)
+    facets = await book_service.get_book_facets(filters, session)
+    return NegotiatedResponse({"items": books, "next_cursor": next_cursor, "facets": facets})
+
+
+@book_router.get("/top-rated", response_model=List[Book], dependencies=[role_checker])
+async def get_top_rated_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    min_reviews: int = Query(1, ge=1),
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Fetch the books with the highest average rating."""
+    return await book_service.get_top_rated_books(session, limit, min_reviews)
+
+
+@book_router.get("/trending", response_model=List[TrendingBookModel], dependencies=[role_checker])
+async def get_trending_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Fetch the books with the most recent review activity."""
+    books = await book_service.get_trending_books(session, limit)
+    return [
+        {**book.model_dump(), "average_rating": book.average_rating, "trending_score": score}
+        for book, score in books
+    ]
+
+
+@book_router.get(
+    "/search", response_model=BookSearchPageModel, dependencies=[role_checker]
+)
+async def search_books(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Search books by title, author or publisher, ranked by relevance."""
+    hits, next_cursor = await book_service.search_books(q, session, limit, cursor)
+    items = [
+        {**book.model_dump(), "average_rating": book.average_rating, "rank": rank}
+        for book, rank in hits
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@book_router.get("/by-tags", response_model=BookTagPageModel, dependencies=[role_checker])
+async def get_books_by_tags(
+    tags: List[str] = Query(..., description="Tag names the books must all have"),
+    exclude: List[str] = Query([], description="Tag names the books must not have"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(access_token_bearer),
 ):
-    """Fetch books submitted by a specific user."""
-    books = await book_service.get_user_books(user_uid, session)
-    return books
+    """
+    Fetch a page of the books tagged with every tag in `tags` and none in `exclude`,
+    newest first, with the total number of matching books.
+    """
+    books, next_cursor, total = await book_service.get_books_by_tags(
+        tags, exclude, session, limit, cursor)
+    return NegotiatedResponse({"items": books, "next_cursor": next_cursor, "total": total})
+
+
+@book_router.get("/export", dependencies=[role_checker])
+async def export_books(
+    format: ExportFormat = ExportFormat.ndjson,
+    _: dict = Depends(access_token_bearer),
+) -> StreamingResponse:
+    """Stream the whole catalog, with tag names and review counts, as NDJSON or CSV."""
+    if format == ExportFormat.csv:
+        body, media_type = iter_csv(), "text/csv"
+    else:
+        body, media_type = iter_ndjson(), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="books.{format.value}"'},
+    )
 
 
 @book_router.post(
@@ -56,24 +189,125 @@ async def create_a_book(
     return new_book
 
 
+@book_router.patch("/", response_model=BookBulkUpdateReport, dependencies=[role_checker])
+async def bulk_update_books(
+    updates: List[BookBulkUpdateItem] = Body(..., max_length=BULK_UPDATE_LIMIT),
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Update many books in one statement. Unknown UIDs are reported, not fatal."""
+    updated, not_found = await book_service.bulk_update_books(updates, session)
+    return {"updated": updated, "not_found": not_found}
+
+
+@book_router.post(
+    "/import", response_model=BookImportReport, dependencies=[role_checker]
+)
+async def import_books(
+    file: UploadFile,
+    format: Optional[ExportFormat] = None,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """Bulk import books from an NDJSON or CSV upload, reporting every rejected row."""
+    if format is None:
+        format = ExportFormat.csv if (file.filename or "").endswith(
+            ".csv") else ExportFormat.ndjson
+
+    user_id = token_details.get("user")["user_uid"]
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    importer = BookImporter(session, user_id)
+    return await importer.run(iter_records(stream, format))
+
+
 @book_router.get(
     "/{book_uid}", response_model=BookDetailModel, dependencies=[role_checker]
 )
 async def get_book(
     book_uid: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(access_token_bearer),
 ) -> BookDetailModel:
     """Fetch details of a specific book by its UID."""
-    book = await book_service.get_book(book_uid, session)
+    # Validate against the book's version before loading or serializing anything
+    version = await book_service.get_book_version(book_uid, session)
+    if version is not None:
+        etag = book_etag(book_uid, version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    book = await book_service.get_book_detail(book_uid, session, version) if version else None
 
     if book:
+        response.headers["ETag"] = book_etag(book_uid, book["version"])
         return book
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND, detail="Book not found."
     )
 
 
+async def _book_version(book_uid: str, session: AsyncSession) -> int:
+    version = await book_service.get_book_version(book_uid, session)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Book not found."
+        )
+    return version
+
+
+@book_router.get(
+    "/{book_uid}/reviews", response_model=ReviewPageModel, dependencies=[role_checker]
+)
+async def get_book_reviews(
+    book_uid: str,
+    expand: List[ReviewExpansion] = Query([]),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """
+    Fetch a page of a book's reviews, newest first; pass `next_cursor` back as
+    `cursor` for the next page. `expand=user` embeds the reviewers.
+    """
+    # Every review write bumps the book's version, which validates plain pages
+    version = await _book_version(book_uid, session)
+    etag = None
+    if not expand:
+        etag = make_etag("book-reviews", book_uid, version, limit, cursor, weak=True)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    reviews, next_cursor = await review_service.get_book_reviews(
+        book_uid, session, limit, cursor, expand)
+    headers = {"ETag": etag} if etag else None
+    return NegotiatedResponse({"items": reviews, "next_cursor": next_cursor}, headers=headers)
+
+
+@book_router.get(
+    "/{book_uid}/reviews/histogram", response_model=RatingHistogramModel, dependencies=[role_checker]
+)
+async def get_rating_histogram(
+    book_uid: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+):
+    """Count a book's reviews per star rating, from 1 to 5."""
+    version = await _book_version(book_uid, session)
+    etag = make_etag("rating-histogram", book_uid, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    histogram = await review_service.get_rating_histogram(book_uid, session, version)
+    response.headers["ETag"] = etag
+    return histogram
+
+
 @book_router.patch("/{book_uid}", response_model=Book, dependencies=[role_checker])
 async def update_book(
     book_uid: str,
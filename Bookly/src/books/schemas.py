@@ -1,6 +1,10 @@
 import uuid
 from datetime import date, datetime
-from pydantic import BaseModel
+from enum import Enum
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from reviews.schemas import ReviewModel
+from tags.schemas import TagModel
 
 
 # Shared fields between models
@@ -27,9 +31,16 @@ class BookUpdateModel(BaseModel):
     language: str | None = None
 
 
+# One entry of a bulk update: the book's UID and the fields to change
+class BookBulkUpdateItem(BookUpdateModel):
+    uid: uuid.UUID
+
+
 # Schema for database response or API output
 class Book(BookBase):
     uid: uuid.UUID
+    review_count: int = 0
+    average_rating: Optional[float] = None
     created_at: datetime
     updated_at: datetime
 
@@ -37,3 +48,87 @@ class Book(BookBase):
         orm_mode = True
 
 
+# Schema for a single book with its reviews and tags
+class BookDetailModel(Book):
+    version: int
+    reviews: List[ReviewModel]
+    tags: List[TagModel]
+
+
+# Schema for a page of books returned by keyset pagination
+class BookPageModel(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+
+
+# A page of books matching a tag query, with the number of matches across all pages
+class BookTagPageModel(BookPageModel):
+    total: int
+
+
+# A search hit with its relevance rank
+class BookSearchHitModel(Book):
+    rank: float
+
+
+# A trending book with its decayed review-activity score
+class TrendingBookModel(Book):
+    trending_score: float
+
+
+# Schema for a page of search results
+class BookSearchPageModel(BaseModel):
+    items: List[BookSearchHitModel]
+    next_cursor: Optional[str] = None
+
+
+# Filters accepted by the faceted book listing; every filter is optional
+class BookFilterModel(BaseModel):
+    language: Optional[str] = None
+    publisher: Optional[str] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+    min_pages: Optional[int] = Field(None, ge=0)
+    max_pages: Optional[int] = Field(None, ge=0)
+    tag: Optional[str] = None
+
+
+# Number of matching books for one facet value
+class FacetCountModel(BaseModel):
+    value: str
+    count: int
+
+
+# A page of filtered books with the facet counts for the whole filtered set
+class BookFacetPageModel(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+    facets: Dict[str, List[FacetCountModel]]
+
+
+# Result of a bulk update
+class BookBulkUpdateReport(BaseModel):
+    updated: List[Book]
+    not_found: List[uuid.UUID]
+
+
+# Supported formats for the catalog export and bulk import
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+# A row rejected during a bulk import
+class RejectedRowModel(BaseModel):
+    line: int
+    errors: List[str]
+
+
+# Summary returned by the bulk import
+class BookImportReport(BaseModel):
+    total_rows: int
+    inserted: int
+    rejected: List[RejectedRowModel]
+    batches: int
+    elapsed_seconds: float
+    rows_per_second: float
@@ -0,0 +1,102 @@
+import asyncio
+import re
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import Book
+
+# Text search configuration used by the `books.search_vector` generated column
+SEARCH_CONFIG = "simple"
+
+# ts_rank's default weights for the A (title), B (author) and C (publisher) labels
+FIELD_WEIGHTS = {"title": 1.0, "author": 0.4, "publisher": 0.2}
+
+# Generated column maintained by PostgreSQL (see the Alembic revision that adds it);
+# it is not mapped on `Book` because it only exists on PostgreSQL.
+search_vector = literal_column("books.search_vector", type_=TSVECTOR)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens, like the `simple` configuration."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class BookSearchIndex:
+    """
+    In-process inverted index used instead of `tsvector` when the database is not PostgreSQL.
+
+    It applies the same rules as `plainto_tsquery('simple', q)`: every query term must
+    match, and each match scores the weight of the field it appears in. Scores follow
+    the same field weighting as `ts_rank` but are not numerically identical to it.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[uuid.UUID, float]] = defaultdict(dict)
+        self._terms: Dict[uuid.UUID, Set[str]] = {}
+        self._lock = asyncio.Lock()
+        self.loaded = False
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Build the index from the books table on first use."""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            result = await session.exec(
+                select(Book.uid, Book.title, Book.author, Book.publisher))
+            for uid, title, author, publisher in result.all():
+                self._index(uid, title, author, publisher)
+            self.loaded = True
+
+    def add(self, uid: uuid.UUID, title: str, author: str, publisher: str) -> None:
+        """Index or re-index a book. A no-op until the index has been built."""
+        if self.loaded:
+            self.remove(uid)
+            self._index(uid, title, author, publisher)
+
+    def remove(self, uid: uuid.UUID) -> None:
+        """Drop a book from the index."""
+        for term in self._terms.pop(uid, ()):
+            postings = self._postings[term]
+            postings.pop(uid, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str) -> List[Tuple[float, uuid.UUID]]:
+        """Return `(score, uid)` pairs matching every query term, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        # Intersect starting from the rarest term to keep the candidate set small
+        postings = sorted((self._postings.get(term, {})
+                          for term in terms), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+
+        hits = [(sum(posting[uid] for posting in postings), uid)
+                for uid in candidates]
+        hits.sort(reverse=True)
+        return hits
+
+    def _index(self, uid: uuid.UUID, title: str, author: str, publisher: str) -> None:
+        fields = {"title": title, "author": author, "publisher": publisher}
+        terms = set()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                postings = self._postings[term]
+                postings[uid] = postings.get(uid, 0.0) + FIELD_WEIGHTS[field]
+                terms.add(term)
+        self._terms[uid] = terms
+
+
+# Per-process fallback index shared by every request
+book_search_index = BookSearchIndex()
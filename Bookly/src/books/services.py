@@ -1,66 +1,398 @@
+import uuid
 from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import cast, column, delete, func, tuple_, update, values
 from sqlmodel import select, desc
 from sqlmodel.ext.asyncio.session import AsyncSession
-from .models import Book
-from .schemas import BookCreateModel, BookUpdateModel
+from conf.cache import TwoTierCache
+from conf.config import settings
+from conf.etag import make_etag
+from conf.metrics import register_metrics
+from conf.pagination import DEFAULT_PAGE_SIZE, build_page, decode_cursor, encode_cursor
+from conf.serialization import row_dicts
+from .facets import count_facets, facet_cache_key, filter_conditions
+from .loading import book_load_options
+from reviews.models import Review
+from tags.catalog import tag_catalog
+from .models import Book, BookTag, book_average_rating
+from .search import SEARCH_CONFIG, book_search_index, search_vector
+from .tag_index import book_tag_index
+from .trending import get_trending_book_uids
+from .schemas import (
+    BookBulkUpdateItem,
+    BookCreateModel,
+    BookDetailModel,
+    BookFilterModel,
+    BookUpdateModel,
+)
+
+# Serialized book details keyed by book UID. Any write that changes a book, its
+# reviews or its tags must invalidate the affected entries.
+book_cache = TwoTierCache(
+    "book",
+    maxsize=settings.BOOK_CACHE_SIZE,
+    ttl=settings.BOOK_CACHE_TTL,
+    redis_ttl=settings.BOOK_CACHE_REDIS_TTL,
+)
+register_metrics("book_cache", book_cache.stats)
+
+# Facet counts keyed by filter combination. Writes don't invalidate them, so counts
+# may lag by up to the TTL.
+facet_cache = TwoTierCache(
+    "book_facets",
+    maxsize=settings.BOOK_FACETS_CACHE_SIZE,
+    ttl=settings.BOOK_FACETS_CACHE_TTL,
+    redis_ttl=settings.BOOK_FACETS_CACHE_TTL,
+)
+register_metrics("book_facet_cache", facet_cache.stats)
+
+# Columns behind the `Book` response schema, selected as plain rows by the list endpoints
+BOOK_ROW_COLUMNS = (
+    Book.uid,
+    Book.title,
+    Book.author,
+    Book.publisher,
+    Book.published_date,
+    Book.page_count,
+    Book.language,
+    Book.review_count,
+    Book.rating_sum,
+    Book.created_at,
+    Book.updated_at,
+)
+
+
+def book_row(row: dict) -> dict:
+    """Shape a row of `BOOK_ROW_COLUMNS` like the `Book` schema."""
+    rating_sum = row.pop("rating_sum")
+    row["average_rating"] = rating_sum / row["review_count"] if row["review_count"] else None
+    return row
+
+
+def book_etag(book_uid, version: int) -> str:
+    """Strong ETag of a book's detail representation."""
+    return make_etag("book", book_uid, version)
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        """Fetch all books ordered by creation date."""
-        statement = select(Book).order_by(desc(Book.created_at))
-        result = await session.exec(statement)
-        return result.all()
+    async def get_all_books(
+        self, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ):
+        """Fetch a page of books as plain dicts, ordered by creation date, newest first."""
+        return await self._row_page(select(*BOOK_ROW_COLUMNS), session, limit, cursor)
 
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
-        """Fetch books for a specific user ordered by creation date."""
-        statement = select(Book).where(
-            Book.user_uid == user_uid).order_by(desc(Book.created_at))
-        result = await session.exec(statement)
-        return result.all()
+    async def get_user_books(
+        self, user_uid: str, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ):
+        """Fetch a page of a user's books as plain dicts, ordered by creation date."""
+        statement = select(*BOOK_ROW_COLUMNS).where(Book.user_uid == user_uid)
+        return await self._row_page(statement, session, limit, cursor)
+
+    async def filter_books(
+        self, filters: BookFilterModel, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ):
+        """Fetch a page of the books matching the filters as plain dicts, newest first."""
+        statement = select(*BOOK_ROW_COLUMNS).where(*filter_conditions(filters))
+        return await self._row_page(statement, session, limit, cursor)
+
+    async def get_books_by_tags(
+        self,
+        tags: List[str],
+        exclude: List[str],
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """
+        Fetch a page of the books having every tag in `tags` and none in `exclude` as
+        plain dicts, newest first, with the total number of matching books.
+
+        Tag names are resolved through the tag catalog snapshot and the set algebra
+        runs on this worker's tag index; only the books on the page are read from
+        the database.
+        """
+        catalog = await tag_catalog.get(session)
+        required = [catalog.uids_by_name.get(name) for name in set(tags)]
+        if None in required:
+            return [], None, 0
+        excluded = [catalog.uids_by_name[name] for name in set(exclude) if name in catalog.uids_by_name]
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
-        """Fetch a book by its UID."""
-        statement = select(Book).where(Book.uid == book_uid)
+        await book_tag_index.ensure_loaded(session)
+        before = decode_cursor(cursor, datetime.fromisoformat, uuid.UUID) if cursor else None
+        keys, total = book_tag_index.query(required, excluded, limit + 1, before)
+        page = keys[:limit]
+        next_cursor = encode_cursor(*page[-1]) if len(keys) > limit else None
+        if not page:
+            return [], next_cursor, total
+
+        result = await session.exec(
+            select(*BOOK_ROW_COLUMNS).where(Book.uid.in_([book_uid for _, book_uid in page])))
+        rows = {row["uid"]: book_row(row) for row in row_dicts(result)}
+        # Books deleted since the index saw them are skipped
+        return [rows[book_uid] for _, book_uid in page if book_uid in rows], next_cursor, total
+
+    async def get_book_facets(self, filters: BookFilterModel, session: AsyncSession):
+        """Count the matching books per facet value, read through the facet cache."""
+        key = facet_cache_key(filters)
+        facets = await facet_cache.get(key)
+        if facets is None:
+            facets = await count_facets(filters, session)
+            await facet_cache.set(key, facets)
+        return facets
+
+    async def get_book(self, book_uid: str, session: AsyncSession, profile: str = "list"):
+        """Fetch a book by its UID, loading the relationships of the given load profile."""
+        statement = select(Book).where(Book.uid == book_uid).options(
+            *book_load_options(profile))
         result = await session.exec(statement)
         return result.first()  # Return None if no book is found
 
+    async def get_book_version(self, book_uid: str, session: AsyncSession) -> Optional[int]:
+        """Fetch only a book's version, with a primary key lookup."""
+        try:
+            book_uid = uuid.UUID(str(book_uid))
+        except ValueError:
+            return None
+
+        result = await session.exec(select(Book.version).where(Book.uid == book_uid))
+        return result.first()
+
+    async def get_book_detail(self, book_uid: str, session: AsyncSession, version: Optional[int] = None):
+        """
+        Fetch a book with its reviews and tags as a JSON-ready dict, read through the cache.
+
+        When the current `version` is known, a cached entry for an older version (still
+        held by another worker's local tier) is treated as a miss.
+        """
+        try:
+            book_uid = uuid.UUID(str(book_uid))
+        except ValueError:
+            return None
+
+        detail = await book_cache.get(str(book_uid))
+        if detail is not None and (version is None or detail.get("version") == version):
+            return detail
+
+        book = await self.get_book(book_uid, session, profile="detail")
+        if not book:
+            return None
+
+        detail = BookDetailModel.model_validate(
+            book, from_attributes=True).model_dump(mode="json")
+        await book_cache.set(str(book_uid), detail)
+        return detail
+
     async def create_book(self, book_data: BookCreateModel, user_uid: str, session: AsyncSession):
         """Create a new book."""
-        # Convert the Pydantic model data into a dictionary and map it to a Book instance
-        book_data_dict = book_data.model_dump()
-
-        # Create a new book instance and set user and published date
-        new_book = Book(**book_data_dict)
-        new_book.published_date = datetime.strptime(
-            book_data_dict["published_date"], "%Y-%m-%d")
-        new_book.user_uid = user_uid
+        # `published_date` has already been parsed into a date by the schema
+        new_book = Book(**book_data.model_dump(), user_uid=user_uid)
 
         session.add(new_book)
         await session.commit()
+        book_search_index.add(new_book.uid, new_book.title,
+                              new_book.author, new_book.publisher)
         return new_book
 
     async def update_book(self, book_uid: str, update_data: BookUpdateModel, session: AsyncSession):
-        """Update an existing book by UID."""
-        book_to_update = await self.get_book(book_uid, session)
-        if not book_to_update:
+        """Update an existing book by UID with a single UPDATE ... RETURNING."""
+        changes = update_data.model_dump(exclude_none=True)
+        if not changes:
+            return await self.get_book(book_uid, session)
+
+        result = await session.exec(self._update_statement(book_uid, changes))
+        updated_book = result.scalar_one_or_none()
+        if not updated_book:
             return None
 
-        # Map the update data to the book instance
-        update_data_dict = update_data.model_dump()
-        for field, value in update_data_dict.items():
-            setattr(book_to_update, field, value)
+        await session.commit()
+        await book_cache.invalidate(str(updated_book.uid))
+        book_search_index.add(updated_book.uid, updated_book.title,
+                              updated_book.author, updated_book.publisher)
+        return updated_book
+
+    async def bulk_update_books(self, updates: List[BookBulkUpdateItem], session: AsyncSession):
+        """
+        Apply many partial book updates in one transaction.
+
+        On PostgreSQL this is a single UPDATE ... FROM (VALUES ...) RETURNING; fields
+        left out of an item are NULL in the VALUES list and keep their current value.
+        Returns the updated books and the UIDs that matched no book.
+        """
+        # A later entry for the same book wins
+        changes: Dict[uuid.UUID, dict] = {
+            item.uid: item.model_dump(exclude={"uid"}) for item in updates}
+        if not changes:
+            return [], []
+
+        if session.bind.dialect.name == "postgresql":
+            fields = list(BookUpdateModel.model_fields)
+            rows = values(
+                column("uid", Book.__table__.c.uid.type),
+                *(column(field, Book.__table__.c[field].type) for field in fields),
+                name="changes",
+            ).data([(book_uid, *(row[field] for field in fields))
+                    for book_uid, row in changes.items()])
+            statement = (
+                update(Book)
+                .where(Book.uid == rows.c.uid)
+                .values(
+                    # Cast, because a VALUES column of NULLs is typed as text
+                    **{field: func.coalesce(cast(rows.c[field], Book.__table__.c[field].type),
+                                            getattr(Book, field))
+                       for field in fields},
+                    version=Book.version + 1,
+                )
+                .returning(Book)
+            )
+            result = await session.exec(statement)
+            updated_books = result.scalars().all()
+        else:
+            updated_books = []
+            for book_uid, row in changes.items():
+                result = await session.exec(self._update_statement(
+                    book_uid, {field: value for field, value in row.items() if value is not None}))
+                updated_books.extend(result.scalars().all())
 
         await session.commit()
-        return book_to_update
+        await book_cache.invalidate(*(str(book.uid) for book in updated_books))
+        for book in updated_books:
+            book_search_index.add(book.uid, book.title, book.author, book.publisher)
+
+        updated_uids = {book.uid for book in updated_books}
+        return updated_books, [book_uid for book_uid in changes if book_uid not in updated_uids]
 
     async def delete_book(self, book_uid: str, session: AsyncSession):
-        """Delete a book by UID."""
-        book_to_delete = await self.get_book(book_uid, session)
-        if not book_to_delete:
+        """
+        Delete a book by UID with a single DELETE ... RETURNING.
+
+        The foreign keys remove the book's tag links and detach its reviews.
+        """
+        if session.bind.dialect.name != "postgresql":
+            # SQLite only applies foreign key actions when they are enabled per connection
+            await session.exec(delete(BookTag).where(BookTag.book_id == book_uid))
+            await session.exec(update(Review).where(Review.book_uid == book_uid).values(book_uid=None))
+
+        result = await session.exec(
+            delete(Book).where(Book.uid == book_uid).returning(Book.uid))
+        deleted_uid = result.scalar_one_or_none()
+        if not deleted_uid:
             return None
 
-        await session.delete(book_to_delete)
         await session.commit()
+        await book_cache.invalidate(str(deleted_uid))
+        # Listed reviews of the book lost their book_uid; imported here because
+        # reviews.services imports this module
+        from reviews.services import review_list_version
+        await review_list_version.bump()
+        book_search_index.remove(deleted_uid)
+        await book_tag_index.update([("remove_book", deleted_uid)])
         return {}
 
+    async def touch_books(self, book_uids, session: AsyncSession) -> None:
+        """
+        Bump the version of books whose detail payload changed, in the caller's transaction.
+        """
+        if book_uids:
+            await session.exec(
+                update(Book)
+                .where(Book.uid.in_([uuid.UUID(str(book_uid)) for book_uid in book_uids]))
+                .values(version=Book.version + 1)
+            )
+
+    async def get_top_rated_books(
+        self, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, min_reviews: int = 1
+    ):
+        """Fetch the best rated books, read in order from the top-rated index."""
+        statement = (
+            select(Book)
+            # `review_count > 0` matches the partial index predicate
+            .where(Book.review_count > 0, Book.review_count >= min_reviews)
+            .options(*book_load_options("list"))
+            .order_by(book_average_rating.desc(), desc(Book.review_count), desc(Book.uid))
+            .limit(limit)
+        )
+        result = await session.exec(statement)
+        return result.all()
+
+    async def get_trending_books(self, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE):
+        """
+        Fetch the books with the most recent review activity, as `(book, score)` pairs.
+
+        The ranking is read from the sorted set published by the trending task; books
+        deleted since the last refresh are skipped.
+        """
+        ranking = await get_trending_book_uids(limit)
+        if not ranking:
+            return []
+
+        statement = (
+            select(Book)
+            .where(Book.uid.in_([uuid.UUID(book_uid) for book_uid, _ in ranking]))
+            .options(*book_load_options("list"))
+        )
+        result = await session.exec(statement)
+        books = {str(book.uid): book for book in result.all()}
+        return [(books[book_uid], score) for book_uid, score in ranking if book_uid in books]
+
+    async def search_books(
+        self, query: str, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ):
+        """Full-text search over title, author and publisher, best match first."""
+        after = decode_cursor(cursor, float, uuid.UUID) if cursor else None
+        if session.bind.dialect.name == "postgresql":
+            hits = await self._search_tsvector(query, session, limit, after)
+        else:
+            hits = await self._search_in_process(query, session, limit, after)
+        return build_page(hits, limit, lambda hit: (hit[1], hit[0].uid))
+
+    @staticmethod
+    def _update_statement(book_uid, changes: dict):
+        """UPDATE ... RETURNING for one book, bumping its version."""
+        return (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(**changes, version=Book.version + 1)
+            .returning(Book)
+        )
+
+    # Keyset pagination on (created_at, uid): the cursor holds the last row's key,
+    # so every page is an index range scan regardless of how deep the client is.
+    def _paginate(self, statement, limit: int, cursor: Optional[str]):
+        if cursor:
+            created_at, uid = decode_cursor(
+                cursor, datetime.fromisoformat, uuid.UUID)
+            statement = statement.where(
+                tuple_(Book.created_at, Book.uid) < tuple_(created_at, uid))
+        return statement.order_by(desc(Book.created_at), desc(Book.uid)).limit(limit + 1)
+
+    async def _row_page(self, statement, session: AsyncSession, limit: int, cursor: Optional[str]):
+        result = await session.exec(self._paginate(statement, limit, cursor))
+        rows = [book_row(row) for row in row_dicts(result)]
+        return build_page(rows, limit, lambda row: (row["created_at"], row["uid"]))
+
+    # Search pages are keyed on (rank, uid); the GIN index narrows the candidates
+    # and only the matching rows are ranked.
+    async def _search_tsvector(self, query: str, session: AsyncSession, limit: int, after):
+        ts_query = func.plainto_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank(search_vector, ts_query)
+        statement = select(Book, rank.label("rank")).where(
+            search_vector.op("@@")(ts_query)).options(*book_load_options("list"))
+        if after:
+            statement = statement.where(tuple_(rank, Book.uid) < tuple_(*after))
+        statement = statement.order_by(
+            desc("rank"), desc(Book.uid)).limit(limit + 1)
+        result = await session.exec(statement)
+        return result.all()
+
+    async def _search_in_process(self, query: str, session: AsyncSession, limit: int, after):
+        await book_search_index.ensure_loaded(session)
+        hits = book_search_index.search(query)
+        if after:
+            hits = [hit for hit in hits if hit < after]
+        hits = hits[:limit + 1]
+
+        statement = select(Book).where(Book.uid.in_(
+            [uid for _, uid in hits])).options(*book_load_options("list"))
+        result = await session.exec(statement)
+        books = {book.uid: book for book in result.all()}
+        return [(books[uid], score) for score, uid in hits if uid in books]
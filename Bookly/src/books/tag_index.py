@@ -0,0 +1,350 @@
+import asyncio
+import bisect
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.broadcast import Broadcast
+from conf.config import settings
+from conf.metrics import register_metrics
+from conf.redis import redis_client
+from .models import Book, BookTag
+
+# Channel carrying index updates from the worker that made a tag-link change to the others
+UPDATES_CHANNEL = "books:tag_index:updates"
+
+# A tag used by more than this fraction of the indexed books is kept as a bitmap
+# (one bit per book); rarer tags as a sorted array of ordinals (32 bits per book
+# tagged), which is the smaller of the two below it
+DENSE_FRACTION = 1 / 32
+
+# A tag's books: sorted uint32 ordinals, or a uint64 bitmap when `dense`
+Postings = Tuple[bool, np.ndarray]
+
+
+def _words(n_bits: int) -> int:
+    return (n_bits + 63) // 64
+
+
+def _pad(bitmap: np.ndarray, n_words: int) -> np.ndarray:
+    if len(bitmap) >= n_words:
+        return bitmap[:n_words]
+    return np.concatenate([bitmap, np.zeros(n_words - len(bitmap), dtype=np.uint64)])
+
+
+def _to_bitmap(ordinals: np.ndarray, n_bits: int) -> np.ndarray:
+    bitmap = np.zeros(_words(n_bits), dtype=np.uint64)
+    np.bitwise_or.at(bitmap, ordinals >> 6, np.left_shift(np.uint64(1), (ordinals & 63).astype(np.uint64)))
+    return bitmap
+
+
+def _bitmap_ordinals(bitmap: np.ndarray, words: np.ndarray) -> np.ndarray:
+    """Return the set bits in some words of a bitmap as ascending ordinals."""
+    bits = np.unpackbits(bitmap[words].view(np.uint8), bitorder="little").reshape(-1, 64)
+    return (words[:, None] * 64 + np.arange(64))[bits.astype(bool)]
+
+
+def _contains(postings: Postings, ordinals: np.ndarray) -> np.ndarray:
+    """Mask of the ordinals that are in a tag's postings."""
+    dense, values = postings
+    if dense:
+        words = ordinals >> 6
+        inside = words < len(values)
+        mask = np.zeros(len(ordinals), dtype=bool)
+        mask[inside] = (values[words[inside]] >> (ordinals[inside] & 63).astype(np.uint64)) & np.uint64(1) == 1
+        return mask
+    positions = np.searchsorted(values, ordinals)
+    mask = positions < len(values)
+    mask[mask] = values[positions[mask]] == ordinals[mask]
+    return mask
+
+
+class BookTagIndex:
+    """
+    Per-worker inverted index of tag -> books, for "tagged A and B but not C" queries.
+
+    Every book gets an ordinal in (created_at, uid) order, so the newest books have
+    the highest ordinals and a keyset cursor maps to an ordinal bound.
+    Each tag's books are a sorted array of ordinals or, for tags on more than
+    `DENSE_FRACTION` of the books, a bitmap; queries intersect the required tags
+    starting from the rarest and subtract the excluded ones without touching the
+    database.
+
+    Tag-link writes are applied in place with `update`, which also broadcasts them
+    to the other workers. A book first linked after the load gets the next ordinal
+    if it is newer than every indexed book; otherwise it joins a tail of books kept
+    with their tag sets, which queries scan and merge into the page. The index is
+    reloaded, folding the tail in, after `max_age` seconds or after the subscription
+    was interrupted.
+    """
+
+    def __init__(self, max_age: float, client=redis_client) -> None:
+        self.max_age = max_age
+        self._keys: List[Tuple[datetime, uuid.UUID]] = []
+        self._ordinals: Dict[uuid.UUID, int] = {}
+        self._postings: Dict[uuid.UUID, Postings] = {}
+        # Books linked since the load that sort before the newest indexed one
+        self._tail: Dict[uuid.UUID, Tuple[Tuple[datetime, uuid.UUID], Set[uuid.UUID]]] = {}
+        self._loaded_at: Optional[float] = None
+        # Updates received while a load is reading the links, applied after it
+        self._pending: Optional[List[Sequence[Any]]] = None
+        self._lock = asyncio.Lock()
+        self.broadcast = Broadcast(
+            UPDATES_CHANNEL,
+            on_message=self._apply,
+            on_reset=self._expire,
+            max_backoff=max_age,
+            client=client,
+        )
+        self.loads = 0
+        self.queries = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Load the books' ordinals and every tag link, unless already loaded."""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            self._pending = []
+            try:
+                books = await session.exec(
+                    select(Book.created_at, Book.uid).order_by(Book.created_at, Book.uid))
+                links = await session.exec(select(BookTag.tag_id, BookTag.book_id))
+                self._build(books.all(), links.all())
+                for operation in self._pending:
+                    self._apply_operation(operation)
+            finally:
+                self._pending = None
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def _build(
+        self,
+        books: Sequence[Tuple[datetime, uuid.UUID]],
+        links: Sequence[Tuple[uuid.UUID, uuid.UUID]],
+    ) -> None:
+        self._keys = [tuple(book) for book in books]
+        self._tail = {}
+        self._ordinals = {book_uid: ordinal for ordinal, (_, book_uid) in enumerate(self._keys)}
+        # Links of books created after the books were read are skipped
+        links = [(tag_uid, self._ordinals[book_uid]) for tag_uid, book_uid in links
+                 if book_uid in self._ordinals]
+        tag_index: Dict[uuid.UUID, int] = {}
+        tag_positions = np.fromiter(
+            (tag_index.setdefault(tag_uid, len(tag_index)) for tag_uid, _ in links),
+            dtype=np.int64, count=len(links))
+        ordinals = np.fromiter((ordinal for _, ordinal in links), dtype=np.uint32, count=len(links))
+
+        # Group the links by tag, each group's ordinals ascending
+        order = np.lexsort((ordinals, tag_positions))
+        bounds = np.searchsorted(tag_positions[order], np.arange(len(tag_index) + 1))
+        ordinals = ordinals[order]
+        self._postings = {}
+        for tag_uid, position in tag_index.items():
+            self._postings[tag_uid] = self._pack(ordinals[bounds[position]:bounds[position + 1]])
+
+    def _pack(self, ordinals: np.ndarray) -> Postings:
+        if len(ordinals) > len(self._keys) * DENSE_FRACTION:
+            return True, _to_bitmap(ordinals, len(self._keys))
+        return False, ordinals
+
+    def bound(self, created_at: datetime, book_uid: uuid.UUID) -> int:
+        """Ordinal bound of a keyset cursor: ordinals below it sort before the key."""
+        return bisect.bisect_left(self._keys, (created_at, book_uid))
+
+    def query(
+        self,
+        required: List[uuid.UUID],
+        excluded: List[uuid.UUID],
+        limit: int,
+        before: Optional[Tuple[datetime, uuid.UUID]] = None,
+    ) -> Tuple[List[Tuple[datetime, uuid.UUID]], int]:
+        """
+        Return the `(created_at, uid)` keys of up to `limit` books that have every
+        required tag and none of the excluded ones, newest first and sorting before
+        the key `before`, with the total number of matching books.
+        """
+        self.queries += 1
+        if not required:
+            return [], 0
+        end = len(self._keys) if before is None else self.bound(*before)
+        keys, total = self._query_indexed(required, excluded, limit, end)
+        if not self._tail:
+            return keys, total
+
+        required_set, excluded_set = set(required), set(excluded)
+        matches = [key for key, tag_uids in self._tail.values()
+                   if required_set <= tag_uids and not excluded_set & tag_uids]
+        total += len(matches)
+        matches = [key for key in matches if before is None or key < before]
+        return sorted(keys + matches, reverse=True)[:limit], total
+
+    def _query_indexed(
+        self,
+        required: List[uuid.UUID],
+        excluded: List[uuid.UUID],
+        limit: int,
+        end: int,
+    ) -> Tuple[List[Tuple[datetime, uuid.UUID]], int]:
+        if any(tag_uid not in self._postings for tag_uid in required):
+            return [], 0
+        postings = sorted((self._postings[tag_uid] for tag_uid in required), key=self._cardinality)
+        excluded = [self._postings[tag_uid] for tag_uid in excluded if tag_uid in self._postings]
+
+        dense, first = postings[0]
+        if dense:
+            # Even the rarest required tag is dense, so intersect whole bitmaps
+            n_words = _words(len(self._keys))
+            bitmap = _pad(first, n_words).copy()
+            for other_dense, values in postings[1:]:
+                bitmap &= _pad(values, n_words) if other_dense else _to_bitmap(values, len(self._keys))
+            for excluded_dense, values in excluded:
+                if excluded_dense:
+                    bitmap &= ~_pad(values, n_words)
+                else:
+                    np.bitwise_and.at(bitmap, values >> 6,
+                                      ~np.left_shift(np.uint64(1), (values & 63).astype(np.uint64)))
+            total = int(np.bitwise_count(bitmap).sum())
+            bitmap = bitmap[:_words(end)].copy()
+            if end % 64:
+                bitmap[-1] &= np.uint64((1 << (end % 64)) - 1)
+            # Every non-zero word holds at least one match, so the last `limit`
+            # non-zero words hold the page
+            ordinals = _bitmap_ordinals(bitmap, np.flatnonzero(bitmap)[-limit:])[-limit:]
+        else:
+            candidates = first
+            for other in postings[1:]:
+                candidates = candidates[_contains(other, candidates)]
+            for other in excluded:
+                candidates = candidates[~_contains(other, candidates)]
+            total = len(candidates)
+            ordinals = candidates[:np.searchsorted(candidates, end)][-limit:]
+
+        keys = self._keys
+        return [keys[ordinal] for ordinal in ordinals[::-1].tolist()], total
+
+    def _cardinality(self, postings: Postings) -> int:
+        dense, values = postings
+        return int(np.bitwise_count(values).sum()) if dense else len(values)
+
+    async def update(self, operations: List[Sequence[Any]]) -> None:
+        """
+        Apply tag-link changes to this worker's index and broadcast them to the others.
+
+        Operations are `("link", book_uid, created_at, [tag_uid, ...])` when tags were
+        linked to a book, `("remove_book", book_uid)` and `("remove_tag", tag_uid)`.
+        """
+        if not operations:
+            return
+        operations = [[_jsonable(value) for value in operation] for operation in operations]
+        self._apply(operations)
+        await self.broadcast.publish(operations)
+
+    def _apply(self, operations: List[Sequence[Any]]) -> None:
+        if self._pending is not None:
+            self._pending.extend(operations)
+            return
+        if self._loaded_at is None:
+            # The next load reads the change from the database
+            return
+        for operation in operations:
+            self._apply_operation(operation)
+
+    def _apply_operation(self, operation: Sequence[Any]) -> None:
+        kind, uid, *args = operation
+        uid = uuid.UUID(uid)
+        if kind == "link":
+            created_at, tag_uids = datetime.fromisoformat(args[0]), args[1]
+            tag_uids = [uuid.UUID(tag_uid) for tag_uid in tag_uids]
+            ordinal = self._ordinals.get(uid)
+            if ordinal is None:
+                key = (created_at, uid)
+                if uid in self._tail or (self._keys and key < self._keys[-1]):
+                    # A book older than the newest indexed one can't be appended
+                    # without breaking the ordinal order
+                    self._tail.setdefault(uid, (key, set()))[1].update(tag_uids)
+                    return
+                ordinal = self._ordinals[uid] = len(self._keys)
+                self._keys.append(key)
+            for tag_uid in tag_uids:
+                self._add(tag_uid, ordinal)
+        elif kind == "remove_book":
+            self._tail.pop(uid, None)
+            ordinal = self._ordinals.pop(uid, None)
+            if ordinal is not None:
+                for tag_uid in list(self._postings):
+                    self._discard(tag_uid, ordinal)
+        elif kind == "remove_tag":
+            self._postings.pop(uid, None)
+            for _, tag_uids in self._tail.values():
+                tag_uids.discard(uid)
+
+    def _add(self, tag_uid: uuid.UUID, ordinal: int) -> None:
+        dense, values = self._postings.get(tag_uid, (False, np.empty(0, dtype=np.uint32)))
+        if dense:
+            if ordinal >> 6 >= len(values):
+                values = _pad(values, _words(len(self._keys)))
+            values[ordinal >> 6] |= np.uint64(1) << np.uint64(ordinal & 63)
+            self._postings[tag_uid] = (True, values)
+            return
+        position = np.searchsorted(values, ordinal)
+        if position < len(values) and values[position] == ordinal:
+            return
+        self._postings[tag_uid] = self._pack(np.insert(values, position, ordinal))
+
+    def _discard(self, tag_uid: uuid.UUID, ordinal: int) -> None:
+        dense, values = self._postings[tag_uid]
+        if dense:
+            if ordinal >> 6 < len(values):
+                values[ordinal >> 6] &= ~(np.uint64(1) << np.uint64(ordinal & 63))
+            return
+        position = np.searchsorted(values, ordinal)
+        if position < len(values) and values[position] == ordinal:
+            self._postings[tag_uid] = (False, np.delete(values, position))
+
+    def _expire(self) -> None:
+        self._loaded_at = None
+
+    async def start(self) -> None:
+        """Start receiving the other workers' updates."""
+        await self.broadcast.start()
+
+    async def stop(self) -> None:
+        await self.broadcast.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size, memory use and load and query counters."""
+        dense = [values for is_dense, values in self._postings.values() if is_dense]
+        return {
+            "books": len(self._ordinals) + len(self._tail),
+            "tail_books": len(self._tail),
+            "tags": len(self._postings),
+            "dense_tags": len(dense),
+            "bytes": sum(values.nbytes for _, values in self._postings.values()),
+            "loaded": self.loaded,
+            "loads": self.loads,
+            "queries": self.queries,
+            "subscribed": self.broadcast.subscribed,
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, set, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+book_tag_index = BookTagIndex(max_age=settings.BOOK_TAG_INDEX_MAX_AGE)
+register_metrics("book_tag_index", book_tag_index.stats)
@@ -0,0 +1,116 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.config import settings
+from conf.redis import redis_client
+from reviews.models import Review
+
+# Hash of book UID -> decayed score as of the watermark
+TRENDING_SCORES_KEY = "trending:scores"
+# Sorted set of the top-N books, read by GET /books/trending
+TRENDING_RANKING_KEY = "trending:books"
+# Creation time of the newest review already folded into the scores
+TRENDING_WATERMARK_KEY = "trending:watermark"
+TRENDING_LOCK_KEY = "trending:lock"
+
+# Scores below this are dropped so the hash only holds books with recent activity
+MIN_SCORE = 1e-3
+# Reviews younger than this may still be uncommitted, so they wait for the next run.
+# A review committed later than this after its created_at is never counted: runs
+# only read past the watermark. Write-behind ingestion stamps reviews when they are
+# queued, so this also has to cover its queueing and flush latency under backlog.
+COMMIT_GRACE = timedelta(minutes=2)
+# How far back the first run looks, in half-lives
+INITIAL_LOOKBACK_HALF_LIVES = 10
+
+
+def decay(scores: np.ndarray, elapsed_seconds, half_life_seconds: float) -> np.ndarray:
+    """Exponentially decay scores (or unit contributions) by the elapsed time."""
+    return scores * np.exp2(-np.asarray(elapsed_seconds, dtype=np.float64) / half_life_seconds)
+
+
+async def refresh_trending(session: AsyncSession, client=redis_client, now: Optional[datetime] = None) -> int:
+    """
+    Fold the reviews written since the last run into the decayed scores and publish
+    the top-N books to the trending sorted set. Returns the number of new reviews.
+
+    Each run decays the stored scores to the new watermark in one vectorized step and
+    adds `2 ** (-age / half_life)` for every new review, so the reviews table is only
+    read from the previous watermark onwards. Reviews committed more than
+    `COMMIT_GRACE` after their creation time are missed.
+    """
+    lock = client.lock(TRENDING_LOCK_KEY,
+                       timeout=settings.TRENDING_REFRESH_INTERVAL)
+    if not await lock.acquire(blocking=False):
+        logging.info("Trending refresh already running, skipping")
+        return 0
+
+    try:
+        half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+        upper = (now or datetime.utcnow()) - COMMIT_GRACE
+        raw_watermark = await client.get(TRENDING_WATERMARK_KEY)
+        watermark = (
+            datetime.fromisoformat(raw_watermark) if raw_watermark
+            else upper - timedelta(seconds=half_life * INITIAL_LOOKBACK_HALF_LIVES)
+        )
+        if upper <= watermark:
+            return 0
+
+        statement = select(Review.book_uid, Review.created_at).where(
+            Review.created_at > watermark,
+            Review.created_at <= upper,
+            Review.book_uid.is_not(None),
+        )
+        result = await session.exec(statement)
+        new_reviews = result.all()
+
+        stored = await client.hgetall(TRENDING_SCORES_KEY)
+        book_uids = list(stored)
+        scores = decay(
+            np.fromiter((float(stored[book_uid]) for book_uid in book_uids),
+                        dtype=np.float64, count=len(book_uids)),
+            (upper - watermark).total_seconds(),
+            half_life,
+        )
+
+        if new_reviews:
+            review_book_uids, created_ats = zip(*new_reviews)
+            # One position per book across the stored and the new reviews' books
+            uids, inverse = np.unique(
+                np.array(book_uids + list(map(str, review_book_uids))), return_inverse=True)
+            merged = np.zeros(len(uids))
+            merged[inverse[:len(book_uids)]] = scores
+            ages = (np.datetime64(upper, "us") - np.array(created_ats, dtype="datetime64[us]")) \
+                / np.timedelta64(1, "s")
+            np.add.at(merged, inverse[len(book_uids):], decay(np.ones(len(ages)), ages, half_life))
+            book_uids, scores = uids.tolist(), merged
+
+        keep = np.flatnonzero(scores >= MIN_SCORE)
+        top_n = min(settings.TRENDING_TOP_N, len(keep))
+        top = keep[np.argpartition(-scores[keep], top_n - 1)[:top_n]] if top_n else keep
+
+        # Swap the state and the published ranking atomically
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(TRENDING_SCORES_KEY, TRENDING_RANKING_KEY)
+            if len(keep):
+                pipe.hset(TRENDING_SCORES_KEY, mapping={
+                    book_uids[i]: repr(float(scores[i])) for i in keep})
+            if len(top):
+                pipe.zadd(TRENDING_RANKING_KEY, {
+                    book_uids[i]: float(scores[i]) for i in top})
+            pipe.set(TRENDING_WATERMARK_KEY, upper.isoformat())
+            await pipe.execute()
+
+        logging.info(
+            f"Trending refreshed with {len(new_reviews)} new reviews, {len(keep)} books scored")
+        return len(new_reviews)
+    finally:
+        await lock.release()
+
+
+async def get_trending_book_uids(limit: int, client=redis_client) -> List[Tuple[str, float]]:
+    """Return up to `limit` `(book_uid, score)` pairs, highest score first."""
+    return await client.zrevrange(TRENDING_RANKING_KEY, 0, limit - 1, withscores=True)
@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+from redis.exceptions import RedisError
+from .broadcast import Broadcast
+from .config import settings
+from .metrics import register_metrics
+from .redis import JTI_EXPIRY, token_blocklist
+
+# Sorted set of revoked JTIs scored by the time their blocklist entry expires, read
+# to seed the filters; the blocklist entries themselves stay plain keys named by JTI
+REVOKED_KEY = "blocklist:revoked"
+# When the filters were first seeded; blocklist keys written before that, or by
+# workers still running the previous release, are not in the sorted set
+REVOKED_SINCE_KEY = "blocklist:revoked:since"
+# Channel on which a revocation is added to every worker's filter
+REVOKED_CHANNEL = "blocklist:revoked"
+# Blocklist keys as written before the sorted set existed: bare UUID4 JTIs
+LEGACY_JTI_PATTERN = "????????-????-????-????-????????????"
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings, sized for `capacity` items at false-positive rate
+    `fp_rate`. The bit positions of an item are derived from one BLAKE2b digest
+    by double hashing.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float) -> None:
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] >> (position & 7) & 1 for position in self._positions(item))
+
+    def estimated_fp_rate(self) -> float:
+        """False-positive rate expected at the current number of items."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class RevokedJtiFilter:
+    """
+    Per-worker Bloom filter of revoked JTIs, so that the blocklist lookup on every
+    authenticated request only goes to Redis when the filter can't rule a token out.
+
+    The filter is seeded from the `REVOKED_KEY` sorted set after every (re)subscription
+    to the revocation channel, and revocations made by other workers are added as
+    they are broadcast. Until a seed completes, or while the subscription is down,
+    the filter can't vouch for anything and every lookup goes to Redis. It is also
+    rebuilt every `rebuild_interval` seconds, which drops expired revocations and
+    bounds how long a lost broadcast goes unnoticed.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float, rebuild_interval: float,
+                 client=token_blocklist) -> None:
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.rebuild_interval = rebuild_interval
+        self.client = client
+        self._filter: Optional[BloomFilter] = None
+        self._seeded_at = 0.0
+        self._seeding: Optional[asyncio.Task] = None
+        # Revocations received while a seed is reading Redis, added to its filter
+        self._pending: Optional[List[str]] = None
+        self.broadcast = Broadcast(
+            REVOKED_CHANNEL,
+            on_message=self._add,
+            # Revocations published while unsubscribed were missed
+            on_reset=self._reseed,
+            max_backoff=rebuild_interval,
+            client=client,
+            on_lost=self._drop,
+        )
+
+        self.lookups = 0
+        self.negatives = 0
+        self.fallbacks = 0
+        self.positives = 0
+        self.false_positives = 0
+        self.seeds = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None and self.broadcast.subscribed
+
+    def might_contain(self, jti: str) -> bool:
+        """Return False only if `jti` is certainly not revoked."""
+        self.lookups += 1
+        subscribed = self.broadcast.subscribed
+        if (subscribed and self._seeding is None
+                and time.monotonic() - self._seeded_at >= self.rebuild_interval):
+            # Keep answering from the current filter while the next one is built
+            self._start_seed()
+        bloom = self._filter
+        if bloom is None or not subscribed:
+            self.fallbacks += 1
+            return True
+        if jti in bloom:
+            self.positives += 1
+            return True
+        self.negatives += 1
+        return False
+
+    async def add(self, jti: str) -> None:
+        """Add a revocation to this worker's filter and broadcast it to the others."""
+        self._add(jti)
+        await self.broadcast.publish(jti)
+
+    def _add(self, jti: str) -> None:
+        if self._pending is not None:
+            self._pending.append(jti)
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def _drop(self) -> None:
+        self._filter = None
+
+    def _reseed(self) -> None:
+        # A seed already running may have read Redis before the missed revocations
+        self._drop()
+        if self._seeding is not None:
+            self._seeding.cancel()
+        self._start_seed()
+
+    def _start_seed(self) -> None:
+        pending = self._pending = []
+        self._seeding = asyncio.create_task(self._seed(pending))
+
+    async def _seed(self, pending: List[str]) -> None:
+        try:
+            jtis = await self._read_revoked()
+            bloom = BloomFilter(self.capacity, self.fp_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            for jti in pending:
+                bloom.add(jti)
+            if bloom.count > self.capacity:
+                logging.warning(
+                    f"{bloom.count} revoked JTIs exceed the filter capacity of {self.capacity}, "
+                    f"false-positive rate is now {bloom.estimated_fp_rate():.4f}")
+            self._filter = bloom
+            self._seeded_at = time.monotonic()
+            self.seeds += 1
+        except RedisError as e:
+            logging.warning(f"Revoked JTI filter could not be seeded: {e}")
+            # Retry on the next lookup rather than on every one
+            self._seeded_at = time.monotonic() - self.rebuild_interval + 1
+        finally:
+            # A cancelled seed finishes after its replacement has started
+            if self._pending is pending:
+                self._pending = None
+            if self._seeding is asyncio.current_task():
+                self._seeding = None
+
+    async def _read_revoked(self) -> List[str]:
+        now = time.time()
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(REVOKED_KEY, "-inf", now)
+            pipe.zrangebyscore(REVOKED_KEY, now, "+inf")
+            pipe.set(REVOKED_SINCE_KEY, now, nx=True)
+            pipe.get(REVOKED_SINCE_KEY)
+            _, jtis, _, since = await pipe.execute()
+        jtis = set(jtis)
+        # Leave a rolling deploy an hour to finish for the keys of the old workers to
+        # expire
+        if now - float(since) < 2 * JTI_EXPIRY:
+            async for key in self.client.scan_iter(match=LEGACY_JTI_PATTERN, count=1000):
+                jtis.add(key)
+        return list(jtis)
+
+    async def start(self) -> None:
+        """Subscribe to revocations; the filter is seeded once subscribed."""
+        await self.broadcast.start()
+
+    async def stop(self) -> None:
+        await self.broadcast.stop()
+        if self._seeding is not None:
+            self._seeding.cancel()
+            self._seeding = None
+        self._filter = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the filter's size and configuration and the lookup counters."""
+        bloom = self._filter
+        return {
+            "ready": self.ready,
+            "subscribed": self.broadcast.subscribed,
+            "capacity": self.capacity,
+            "fp_rate": self.fp_rate,
+            "size_bits": bloom.size if bloom else None,
+            "hashes": bloom.hashes if bloom else None,
+            "revoked": bloom.count if bloom else None,
+            "estimated_fp_rate": round(bloom.estimated_fp_rate(), 6) if bloom else None,
+            "age_seconds": round(time.monotonic() - self._seeded_at, 1) if bloom else None,
+            "seeds": self.seeds,
+            "lookups": self.lookups,
+            "negatives": self.negatives,
+            "positives": self.positives,
+            "false_positives": self.false_positives,
+            "fallbacks": self.fallbacks,
+        }
+
+
+revoked_jti_filter = RevokedJtiFilter(
+    capacity=settings.REVOKED_JTI_FILTER_CAPACITY,
+    fp_rate=settings.REVOKED_JTI_FILTER_FP_RATE,
+    rebuild_interval=settings.REVOKED_JTI_FILTER_REBUILD_INTERVAL,
+)
+register_metrics("revoked_jti_filter", revoked_jti_filter.stats)
+
+
+async def add_jti_to_blocklist(jti: str) -> None:
+    """
+    Add a JTI (JWT ID) to the blocklist with an expiration time.
+
+    Args:
+        jti (str): The JWT ID to block.
+    """
+    async with token_blocklist.pipeline(transaction=True) as pipe:
+        pipe.set(name=jti, value=1, ex=JTI_EXPIRY)
+        pipe.zadd(REVOKED_KEY, {jti: time.time() + JTI_EXPIRY})
+        await pipe.execute()
+    await revoked_jti_filter.add(jti)
+
+
+async def token_in_blocklist(jti: str) -> bool:
+    """
+    Check if a JTI (JWT ID) is in the blocklist.
+
+    Only JTIs the revoked JTI filter can't rule out are looked up in Redis.
+
+    Args:
+        jti (str): The JWT ID to check.
+
+    Returns:
+        bool: True if the JTI is in the blocklist, False otherwise.
+    """
+    if not revoked_jti_filter.might_contain(jti):
+        return False
+    exists = await token_blocklist.exists(jti) > 0
+    if not exists and revoked_jti_filter.ready:
+        revoked_jti_filter.false_positives += 1
+    return exists
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Optional
+from redis.exceptions import RedisError
+from .redis import redis_client
+
+
+class Broadcast:
+    """
+    Fan small JSON messages out to every worker over a Redis pub/sub channel.
+
+    Messages published by this process are not delivered back to it. Pub/sub does not
+    queue messages for disconnected subscribers, so after every (re)subscription
+    `on_reset` is called to let the owner discard state that may have missed some,
+    and `on_lost`, if given, as soon as a subscription fails. Redis failures are
+    logged; publishing never raises and the subscription retries with exponential
+    backoff. A message that can't be decoded or handled is logged and skipped.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        on_message: Callable[[Any], None],
+        on_reset: Callable[[], None],
+        max_backoff: float = 60.0,
+        client=redis_client,
+        on_lost: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.channel = channel
+        self.on_message = on_message
+        self.on_reset = on_reset
+        self.on_lost = on_lost
+        self.max_backoff = max_backoff
+        self.client = client
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        # Set only while a subscription is live, not while retrying after losing one
+        self._subscribed = False
+
+    @property
+    def subscribed(self) -> bool:
+        return self._subscribed
+
+    async def publish(self, payload: Any = None) -> None:
+        """Send a payload to the other workers."""
+        message = json.dumps({"origin": self._origin, "payload": payload})
+        try:
+            await self.client.publish(self.channel, message)
+        except RedisError as e:
+            logging.warning(f"Broadcast on {self.channel} could not be published: {e}")
+
+    async def start(self) -> None:
+        """Start delivering other workers' messages to `on_message`."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(), name=f"broadcast:{self.channel}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed = True
+                self.on_reset()
+                backoff = 1.0
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._deliver(message["data"])
+            except RedisError as e:
+                self._subscribed = False
+                logging.warning(f"Subscription to {self.channel} lost, retrying in {backoff:.0f}s: {e}")
+                if self.on_lost is not None:
+                    self.on_lost()
+            finally:
+                self._subscribed = False
+                await pubsub.aclose()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _deliver(self, data: str) -> None:
+        try:
+            envelope = json.loads(data)
+            if envelope["origin"] != self._origin:
+                self.on_message(envelope["payload"])
+        except Exception:
+            logging.exception(f"Message on {self.channel} could not be handled")
@@ -0,0 +1,182 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from redis.exceptions import RedisError
+from .redis import redis_client
+
+# Returned by `LRUCache.get` when a key is absent or expired
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value, or `default` if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries beyond `maxsize`."""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache's size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TwoTierCache:
+    """
+    Read-through cache of JSON-serializable values: an in-process LRU in front of Redis.
+
+    The local tier absorbs hot keys without a network round trip; Redis shares entries
+    between workers. Invalidation clears Redis for every worker, while other workers'
+    local copies expire within the local TTL. Redis failures degrade to a cache miss.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, redis_ttl: int, client=redis_client) -> None:
+        self.namespace = namespace
+        self.local = LRUCache(maxsize, ttl)
+        self.redis_ttl = redis_ttl
+        self.client = client
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value from the local tier or Redis, or None on a miss."""
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+
+        try:
+            raw = await self.client.get(self._key(key))
+        except RedisError as e:
+            logging.warning(f"Cache read failed for {self._key(key)}: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        value = json.loads(raw)
+        self.redis_hits += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        """Store a value in both tiers."""
+        self.local.set(key, value)
+        try:
+            await self.client.set(self._key(key), json.dumps(value), ex=self.redis_ttl)
+        except RedisError as e:
+            logging.warning(f"Cache write failed for {self._key(key)}: {e}")
+
+    async def invalidate(self, *keys: Hashable) -> None:
+        """Drop keys from both tiers."""
+        if not keys:
+            return
+        for key in keys:
+            self.local.pop(key)
+        try:
+            await self.client.delete(*(self._key(key) for key in keys))
+        except RedisError as e:
+            logging.warning(f"Cache invalidation failed for {self.namespace}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.local.hits + self.redis_hits + self.misses
+        return {
+            "local": self.local.stats(),
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.local.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class VersionCounter:
+    """
+    Redis counter that changes with every write to a collection, for validators that
+    don't have to read the collection.
+
+    The counter starts from the current time in nanoseconds, so a key lost with Redis
+    doesn't reissue values that clients may still hold. Reads return None when Redis
+    is unavailable, and callers then send no validator rather than risk a stale 304.
+    """
+
+    def __init__(self, key: str, client=redis_client) -> None:
+        self.key = key
+        self.client = client
+
+    async def get(self) -> Optional[int]:
+        """Return the current version, or None if Redis failed."""
+        try:
+            value = await self.client.get(self.key)
+            if value is None:
+                async with self.client.pipeline(transaction=True) as pipe:
+                    pipe.set(self.key, time.time_ns(), nx=True)
+                    pipe.get(self.key)
+                    _, value = await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Version {self.key} could not be read: {e}")
+            return None
+        return int(value)
+
+    async def bump(self) -> None:
+        """Move to a new version after a committed write."""
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(self.key, time.time_ns(), nx=True)
+                pipe.incr(self.key)
+                await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Version {self.key} could not be bumped: {e}")
@@ -12,7 +12,24 @@ celery_app = Celery(
 celery_app.conf.update(
     task_routes={
         'src.tasks.*': {'queue': 'default'},
-    }
+    },
+    beat_schedule={
+        # Repair any drift in the denormalized book rating aggregates
+        'reconcile-book-ratings': {
+            'task': 'reconcile_book_ratings',
+            'schedule': settings.RATING_RECONCILE_INTERVAL,
+        },
+        # Fold new reviews into the decayed trending scores
+        'refresh-trending-books': {
+            'task': 'refresh_trending_books',
+            'schedule': settings.TRENDING_REFRESH_INTERVAL,
+        },
+        # Recompute tag co-occurrence and the related tag lists from scratch
+        'rebuild-related-tags': {
+            'task': 'rebuild_related_tags',
+            'schedule': settings.RELATED_TAGS_REBUILD_INTERVAL,
+        },
+    },
 )
 
 
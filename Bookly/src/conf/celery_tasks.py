@@ -11,3 +11,68 @@ def send_email(recipients: List[str], subject: str, body: str):
     # Ensure `mail.send_message` is async; otherwise, this conversion is unnecessary
     async_to_sync(mail.send_message)(message)
     print("Email sent")
+
+
+async def _reconcile_book_ratings():
+    # Imported here so mail-only workers don't load the ORM models
+    import auth.models  # noqa: F401
+    from reviews.services import ReviewService
+    from .database import async_engine, async_session
+
+    try:
+        async with async_session() as session:
+            return await ReviewService().reconcile_rating_aggregates(session)
+    finally:
+        # Each task runs on a fresh event loop, so pooled connections can't be reused
+        await async_engine.dispose()
+
+
+@celery_app.task(name="reconcile_book_ratings")
+def reconcile_book_ratings():
+    repaired = async_to_sync(_reconcile_book_ratings)()
+    print(f"Rating aggregates repaired for {len(repaired)} books")
+
+
+async def _refresh_trending_books():
+    import auth.models  # noqa: F401
+    import redis.asyncio as aioredis
+    from books.trending import refresh_trending
+    from .config import settings
+    from .database import async_engine, async_session
+
+    # A client bound to this task's event loop rather than the shared one
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        async with async_session() as session:
+            return await refresh_trending(session, client)
+    finally:
+        await client.aclose()
+        await async_engine.dispose()
+
+
+@celery_app.task(name="refresh_trending_books")
+def refresh_trending_books():
+    new_reviews = async_to_sync(_refresh_trending_books)()
+    print(f"Trending books refreshed with {new_reviews} new reviews")
+
+
+async def _rebuild_related_tags():
+    import auth.models  # noqa: F401
+    import redis.asyncio as aioredis
+    from tags.related import rebuild_related_tags as rebuild
+    from .config import settings
+    from .database import async_engine, async_session
+
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        async with async_session() as session:
+            return await rebuild(session, client)
+    finally:
+        await client.aclose()
+        await async_engine.dispose()
+
+
+@celery_app.task(name="rebuild_related_tags")
+def rebuild_related_tags():
+    tags = async_to_sync(_rebuild_related_tags)()
+    print(f"Related tags rebuilt for {tags} tags")
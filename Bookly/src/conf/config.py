@@ -22,6 +22,82 @@ class Settings:
     USE_CREDENTIALS: bool = os.getenv("USE_CREDENTIALS", "True") == "True"
     VALIDATE_CERTS: bool = os.getenv("VALIDATE_CERTS", "True") == "True"
     DOMAIN: str = os.getenv("DOMAIN")
+    # Verified JWT claims cached per worker, and how long rejected tokens are remembered
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    REJECTED_TOKEN_CACHE_SIZE: int = int(
+        os.getenv("REJECTED_TOKEN_CACHE_SIZE", 10000))
+    REJECTED_TOKEN_CACHE_TTL: int = int(
+        os.getenv("REJECTED_TOKEN_CACHE_TTL", 5))
+    # Per-worker Bloom filter of revoked token JTIs: the number of revocations it is
+    # sized for, the false-positive rate at that size, and how often it is rebuilt
+    # from Redis to pick up revocations whose broadcast was lost
+    REVOKED_JTI_FILTER_CAPACITY: int = int(
+        os.getenv("REVOKED_JTI_FILTER_CAPACITY", 100000))
+    REVOKED_JTI_FILTER_FP_RATE: float = float(
+        os.getenv("REVOKED_JTI_FILTER_FP_RATE", 0.001))
+    REVOKED_JTI_FILTER_REBUILD_INTERVAL: int = int(
+        os.getenv("REVOKED_JTI_FILTER_REBUILD_INTERVAL", 300))
+    # Principals of authenticated users; the local TTL bounds how long a worker that
+    # missed an invalidation keeps serving an old role, the Redis TTL how long every
+    # worker may if the invalidation couldn't reach Redis
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+    PRINCIPAL_CACHE_REDIS_TTL: int = int(
+        os.getenv("PRINCIPAL_CACHE_REDIS_TTL", 300))
+    # Book detail cache: in-process LRU in front of Redis
+    BOOK_CACHE_SIZE: int = int(os.getenv("BOOK_CACHE_SIZE", 1024))
+    BOOK_CACHE_TTL: int = int(os.getenv("BOOK_CACHE_TTL", 30))
+    BOOK_CACHE_REDIS_TTL: int = int(os.getenv("BOOK_CACHE_REDIS_TTL", 600))
+    # Seconds between runs of the rating aggregate reconciliation task
+    RATING_RECONCILE_INTERVAL: int = int(
+        os.getenv("RATING_RECONCILE_INTERVAL", 3600))
+    # Books whose rows the reconciliation locks and repairs per transaction
+    RATING_RECONCILE_CHUNK_SIZE: int = int(
+        os.getenv("RATING_RECONCILE_CHUNK_SIZE", 1000))
+    # Trending books: review activity with exponential time decay
+    TRENDING_HALF_LIFE_HOURS: float = float(
+        os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+    TRENDING_TOP_N: int = int(os.getenv("TRENDING_TOP_N", 100))
+    TRENDING_REFRESH_INTERVAL: int = int(
+        os.getenv("TRENDING_REFRESH_INTERVAL", 300))
+    # Facet counts cached per filter combination
+    BOOK_FACETS_CACHE_SIZE: int = int(os.getenv("BOOK_FACETS_CACHE_SIZE", 256))
+    BOOK_FACETS_CACHE_TTL: int = int(os.getenv("BOOK_FACETS_CACHE_TTL", 60))
+    # Per-book rating histograms, invalidated by review writes to the book
+    RATING_HISTOGRAM_CACHE_SIZE: int = int(
+        os.getenv("RATING_HISTOGRAM_CACHE_SIZE", 1024))
+    RATING_HISTOGRAM_CACHE_TTL: int = int(
+        os.getenv("RATING_HISTOGRAM_CACHE_TTL", 30))
+    RATING_HISTOGRAM_CACHE_REDIS_TTL: int = int(
+        os.getenv("RATING_HISTOGRAM_CACHE_REDIS_TTL", 86400))
+    # Seconds a worker's tag catalog snapshot may be served without an invalidation
+    # (only matters while the Redis subscription is down)
+    TAG_CATALOG_MAX_AGE: int = int(os.getenv("TAG_CATALOG_MAX_AGE", 300))
+    # Tag autocomplete: memoized queries per worker, and seconds between full reloads
+    TAG_AUTOCOMPLETE_CACHE_SIZE: int = int(
+        os.getenv("TAG_AUTOCOMPLETE_CACHE_SIZE", 4096))
+    TAG_AUTOCOMPLETE_MAX_AGE: int = int(
+        os.getenv("TAG_AUTOCOMPLETE_MAX_AGE", 3600))
+    # Seconds between full reloads of each worker's tag -> books index
+    BOOK_TAG_INDEX_MAX_AGE: int = int(os.getenv("BOOK_TAG_INDEX_MAX_AGE", 3600))
+    # Related tags: neighbours kept per tag, fewest shared books for a pair to count,
+    # and seconds between full rebuilds of the co-occurrence counts
+    RELATED_TAGS_TOP_K: int = int(os.getenv("RELATED_TAGS_TOP_K", 20))
+    RELATED_TAGS_MIN_COOCCURRENCE: int = int(
+        os.getenv("RELATED_TAGS_MIN_COOCCURRENCE", 2))
+    RELATED_TAGS_REBUILD_INTERVAL: int = int(
+        os.getenv("RELATED_TAGS_REBUILD_INTERVAL", 3600))
+    # Write-behind review ingestion: queued reviews are written in batches
+    REVIEW_INGEST_ENABLED: bool = os.getenv(
+        "REVIEW_INGEST_ENABLED", "False") == "True"
+    REVIEW_INGEST_QUEUE_SIZE: int = int(
+        os.getenv("REVIEW_INGEST_QUEUE_SIZE", 10000))
+    REVIEW_INGEST_BATCH_SIZE: int = int(
+        os.getenv("REVIEW_INGEST_BATCH_SIZE", 500))
+    REVIEW_INGEST_FLUSH_INTERVAL: float = float(
+        os.getenv("REVIEW_INGEST_FLUSH_INTERVAL", 0.05))
+    REVIEW_INGEST_STATUS_TTL: int = int(
+        os.getenv("REVIEW_INGEST_STATUS_TTL", 86400))
 
 
 # Initialize settings instance
@@ -0,0 +1,34 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Response, status
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    Build an opaque entity tag from the values that identify a representation.
+    """
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current entity tag.
+
+    If-None-Match uses the weak comparison, so `W/` prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque
+               for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Return an empty 304 response carrying the entity tag.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,18 @@
+from typing import Any, Callable, Dict
+
+# Named providers of runtime counters, collected by the metrics endpoint
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Register a callable returning a snapshot of a component's counters.
+    """
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Collect the current counters of every registered component.
+    """
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,169 @@
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+import msgpack
+import orjson
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack"}
+
+# Appended inside the quotes of an ETag so each representation has its own validator
+MSGPACK_ETAG_SUFFIX = ".msgpack"
+
+# Whether the request being handled negotiated MessagePack
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """
+    Return True if the Accept header prefers MessagePack over JSON.
+
+    MessagePack must be listed explicitly; on equal quality it wins over JSON.
+    """
+    if not accept:
+        return False
+
+    quality = {"msgpack": 0.0, "json": 0.0}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type.lower() in MSGPACK_MEDIA_TYPES:
+            quality["msgpack"] = max(quality["msgpack"], q)
+        elif media_type.lower() == "application/json":
+            quality["json"] = max(quality["json"], q)
+
+    return quality["msgpack"] > 0 and quality["msgpack"] >= quality["json"]
+
+
+def packb(content: Any) -> bytes:
+    """
+    Encode content to MessagePack with the same scalar formats as the JSON responses.
+
+    Validated response models arrive as JSON-ready primitives and pack directly.
+    Plain rows still hold UUIDs and datetimes, which msgpack has no type for; those
+    go through orjson first, which converts them far faster than a per-value
+    Python `default` hook (about 3x on a 5000-row review list).
+    """
+    try:
+        return msgpack.packb(content, datetime=False)
+    except TypeError:
+        # Raised at the first unsupported value, so little work is wasted
+        return msgpack.packb(orjson.loads(orjson.dumps(content)))
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """
+    Render JSON with orjson, or MessagePack when the request negotiated it.
+
+    Content is whatever the route produced (the validated response model or plain
+    rows), so both formats carry the same schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if _wants_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return packb(content)
+        return super().render(content)
+
+
+def prerendered_response(
+    json_body: bytes, msgpack_body: bytes, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Return a body serialized ahead of time, in the format the request negotiated.
+    """
+    if _wants_msgpack.get():
+        return Response(msgpack_body, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return Response(json_body, media_type="application/json", headers=headers)
+
+
+def _with_headers(request: Request, headers: Dict[str, Optional[str]]) -> Request:
+    """
+    Copy a request with some headers replaced (or removed when the value is None),
+    keeping a body that has already been read.
+    """
+    names = {name.encode("latin-1") for name in headers}
+    raw = [(name, value) for name, value in request.scope["headers"] if name not in names]
+    raw.extend((name.encode("latin-1"), value.encode("latin-1"))
+               for name, value in headers.items() if value is not None)
+    copy = Request({**request.scope, "headers": raw}, request.receive)
+    for cached in ("_body", "_json"):
+        if hasattr(request, cached):
+            setattr(copy, cached, getattr(request, cached))
+    return copy
+
+
+def _msgpack_etag(etag: str) -> str:
+    return f'{etag[:-1]}{MSGPACK_ETAG_SUFFIX}"'
+
+
+def _json_if_none_match(if_none_match: str) -> str:
+    """
+    Map MessagePack validators back to the ETags the routes compute. JSON validators
+    must not match a MessagePack representation, so they are dropped.
+    """
+    if if_none_match.strip() == "*":
+        return if_none_match
+    suffix = f'{MSGPACK_ETAG_SUFFIX}"'
+    return ", ".join(
+        f'{tag[:-len(suffix)]}"' for tag in (part.strip() for part in if_none_match.split(","))
+        if tag.endswith(suffix)
+    )
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route that accepts MessagePack request bodies and answers in MessagePack when
+    the client asks for it with `Accept: application/msgpack`.
+
+    MessagePack bodies are decoded up front and handed to FastAPI as an already
+    parsed JSON body, so validation runs against the same request schemas.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type")
+            if content_type and _media_type(content_type) in MSGPACK_MEDIA_TYPES:
+                body = await request.body()
+                try:
+                    parsed = msgpack.unpackb(body) if body else None
+                except (ValueError, msgpack.UnpackException) as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Malformed MessagePack body.",
+                    ) from e
+                request._json = parsed
+                request = _with_headers(request, {"content-type": "application/json"})
+
+            wants_msgpack = accepts_msgpack(request.headers.get("accept"))
+            if wants_msgpack and request.headers.get("if-none-match"):
+                request = _with_headers(request, {
+                    "if-none-match": _json_if_none_match(request.headers["if-none-match"]) or None,
+                })
+
+            token = _wants_msgpack.set(wants_msgpack)
+            try:
+                response = await handler(request)
+            finally:
+                _wants_msgpack.reset(token)
+
+            response.headers.append("Vary", "Accept")
+            if wants_msgpack and "etag" in response.headers:
+                response.headers["etag"] = _msgpack_etag(response.headers["etag"])
+            return response
+
+        return negotiated_handler
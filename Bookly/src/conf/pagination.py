@@ -0,0 +1,58 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+
+# Page size limits shared by every paginated endpoint
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+    """
+    payload = json.dumps([_serialize(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor`, converting each key with its parser.
+
+    Raises:
+        HTTPException: If the cursor is malformed or does not match the expected keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("cursor key count mismatch")
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor.",
+        )
+
+
+def build_page(
+    rows: Sequence[Any], limit: int, key: Callable[[Any], Tuple[Any, ...]]
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split a result fetched with `limit + 1` rows into the page items and the next cursor.
+    """
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return items, next_cursor
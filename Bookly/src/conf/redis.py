@@ -4,29 +4,7 @@ from .config import settings
 # Expiry time for JTI in seconds
 JTI_EXPIRY = 3600
 
-# Initialize Redis client
-token_blocklist = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+# Initialize Redis client, shared by the token blocklist and the caches
+redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+token_blocklist = redis_client
 
-
-async def add_jti_to_blocklist(jti: str) -> None:
-    """
-    Add a JTI (JWT ID) to the blocklist with an expiration time.
-
-    Args:
-        jti (str): The JWT ID to block.
-    """
-    await token_blocklist.set(name=jti, value=1, ex=JTI_EXPIRY)
-
-
-async def token_in_blocklist(jti: str) -> bool:
-    """
-    Check if a JTI (JWT ID) is in the blocklist.
-
-    Args:
-        jti (str): The JWT ID to check.
-
-    Returns:
-        bool: True if the JTI is in the blocklist, False otherwise.
-    """
-    exists = await token_blocklist.exists(jti)
-    return exists > 0
@@ -0,0 +1,13 @@
+from typing import Any, Dict, List
+
+
+def row_dicts(result) -> List[Dict[str, Any]]:
+    """
+    Turn a result of selected columns into plain dicts keyed by column label.
+
+    List endpoints select exactly the columns of their response schema and hand
+    these dicts to `ORJSONResponse`, so no ORM instances or Pydantic models are
+    built per row.
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result.all()]
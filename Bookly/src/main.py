@@ -6,7 +6,16 @@ from auth.routes import auth_router
 # from reviews.routes import review_router
 # from tags.routes import tags_router
 from conf.database import get_db, init_db
+from conf.config import settings
+from conf.metrics import collect_metrics
+from books.tag_index import book_tag_index
+from reviews.ingest import review_ingestor
+from tags.autocomplete import tag_autocomplete
+from tags.catalog import tag_catalog
+from auth.dependencies import RoleChecker
 from auth.middleware import register_middleware
+from auth.principals import principal_cache
+from conf.blocklist import revoked_jti_filter
 
 # Define the API version
 API_VERSION = "v1"
@@ -50,6 +59,24 @@ register_middleware(app)
 async def on_startup():
     """Initialize the database when the application starts."""
     await init_db()
+    await revoked_jti_filter.start()
+    await principal_cache.start()
+    await tag_catalog.start()
+    await tag_autocomplete.start()
+    await book_tag_index.start()
+    if settings.REVIEW_INGEST_ENABLED:
+        await review_ingestor.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Write the reviews still queued for ingestion and stop background listeners."""
+    await review_ingestor.stop()
+    await revoked_jti_filter.stop()
+    await principal_cache.stop()
+    await tag_catalog.stop()
+    await tag_autocomplete.stop()
+    await book_tag_index.stop()
 
 
 @app.get("/", summary="Test Database Connection")
@@ -65,6 +92,16 @@ async def read_root(db: AsyncSession = Depends(get_db)):
         return {"message": "Database connection failed", "error": str(e)}
 
 
+@app.get(f"{VERSION_PREFIX}/metrics", summary="Runtime Metrics",
+         dependencies=[Depends(RoleChecker(["admin"]))])
+async def read_metrics():
+    """
+    Return cache and queue counters collected from every registered component.
+    Admins only: the counters expose internal state.
+    """
+    return collect_metrics()
+
+
 # Include routers for modular endpoints
 app.include_router(auth_router, prefix=f"{
                    VERSION_PREFIX}/auth", tags=["Authentication"])
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.config import settings
+from conf.database import async_session
+from conf.metrics import register_metrics
+from conf.redis import redis_client
+from books.models import Book
+from books.services import book_cache
+from .models import Review
+from .schemas import ReviewCreateModel
+from .services import rating_histogram_cache, review_list_version
+
+# Why a queued review was not stored, kept in Redis so any worker can report it
+REJECTED_KEY = "review_ingest:rejected:{}"
+BOOK_NOT_FOUND = "Book not found."
+WRITE_FAILED = "Review could not be stored."
+
+# A queued review row and, for callers waiting on the commit, its future
+QueuedReview = Tuple[Dict[str, Any], Optional[asyncio.Future]]
+
+
+class ReviewIngestor:
+    """
+    Write-behind review ingestion with group commit.
+
+    Requests put validated reviews on a bounded in-process queue and return at once.
+    A background task takes up to `batch_size` reviews, waiting at most
+    `flush_interval` seconds for a batch to fill, and writes them with one book
+    lookup, one multi-row INSERT, one aggregate UPDATE and a single commit. The books
+    are locked against deletion until the commit; if a row still violates a
+    constraint, the batch is retried in halves so only the offending reviews fail.
+
+    Queued reviews live only in this worker's memory until their batch commits; a
+    crash loses them. Callers that need a durable acknowledgement wait for the commit.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        status_ttl: int,
+        session_factory=async_session,
+        client=redis_client,
+    ) -> None:
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.status_ttl = status_ttl
+        self.session_factory = session_factory
+        self.client = client
+        # Created on start, in the serving event loop
+        self.queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Reviews the writer has taken off the queue and not yet settled
+        self._batch: List[QueuedReview] = []
+
+        self.enqueued = 0
+        self.queue_full = 0
+        self.stored = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    async def start(self) -> None:
+        """Create the queue and start the background writer."""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer = asyncio.create_task(self._run(self.queue), name="review-ingest-writer")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting reviews, flush what is queued, then stop the writer."""
+        if not self.running:
+            return
+        queue, self.queue = self.queue, None
+        try:
+            await asyncio.wait_for(queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Review ingestion stopped with {queue.qsize()} reviews unwritten")
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+
+        # Don't leave callers waiting on reviews that were never written
+        unwritten, self._batch = self._batch, []
+        while not queue.empty():
+            unwritten.append(queue.get_nowait())
+            queue.task_done()
+        if unwritten:
+            self.failed += len(unwritten)
+            await self._settle(unwritten, {row["uid"]: WRITE_FAILED for row, _ in unwritten})
+
+    async def submit(
+        self,
+        user_uid: uuid.UUID,
+        book_uid: uuid.UUID,
+        review_data: ReviewCreateModel,
+        wait: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Queue a review and return its receipt.
+
+        The receipt's `uid` is the UID the review is stored under. With `wait`, the
+        call returns once the review's batch has committed.
+
+        Raises:
+            HTTPException: 503 if ingestion is not running or the queue is full; with
+                `wait`, 404 if the book does not exist and 500 if the review could not
+                be stored.
+        """
+        if self.queue is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Review ingestion is not enabled.",
+            )
+
+        now = datetime.utcnow()
+        row = {
+            "uid": uuid.uuid4(),
+            "rating": review_data.rating,
+            "review_text": review_data.review_text,
+            "user_uid": user_uid,
+            "book_uid": book_uid,
+            "created_at": now,
+            "updated_at": now,
+        }
+        future = asyncio.get_running_loop().create_future() if wait else None
+        try:
+            self.queue.put_nowait((row, future))
+        except asyncio.QueueFull:
+            self.queue_full += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many reviews are waiting to be written. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.enqueued += 1
+
+        if future is None:
+            return {"uid": row["uid"], "status": "pending"}
+        detail = await future
+        if detail is not None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND if detail == BOOK_NOT_FOUND
+                else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=detail,
+            )
+        return {"uid": row["uid"], "status": "stored"}
+
+    async def get_status(self, review_uid: uuid.UUID, session: AsyncSession) -> Dict[str, Any]:
+        """
+        Report whether a queued review was stored, rejected or is still pending.
+
+        UIDs that were never queued also read as pending.
+        """
+        result = await session.exec(select(Review.uid).where(Review.uid == review_uid))
+        if result.first():
+            return {"uid": review_uid, "status": "stored"}
+
+        try:
+            detail = await self.client.get(REJECTED_KEY.format(review_uid))
+        except RedisError as e:
+            logging.warning(f"Review ingestion status read failed: {e}")
+            detail = None
+        if detail is not None:
+            return {"uid": review_uid, "status": "rejected", "detail": detail}
+        return {"uid": review_uid, "status": "pending"}
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[QueuedReview] = [await queue.get()]
+            self._batch = batch
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            except Exception:
+                logging.exception(f"Failed to write a batch of {len(batch)} reviews")
+                self.failed += len(batch)
+                await self._settle(batch, {row["uid"]: WRITE_FAILED for row, _ in batch})
+            finally:
+                for _ in batch:
+                    queue.task_done()
+            # Left in place if the writer is cancelled, for `stop` to settle
+            self._batch = []
+
+    async def _flush(self, batch: List[QueuedReview]) -> None:
+        started = time.perf_counter()
+        stored, rejected = await self._write([row for row, _ in batch])
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.stored += len(stored)
+        self.rejected += sum(detail == BOOK_NOT_FOUND for detail in rejected.values())
+        self.failed += sum(detail == WRITE_FAILED for detail in rejected.values())
+        self.last_flush_seconds = elapsed
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+
+        if stored:
+            book_uids = list({str(row["book_uid"]) for row in stored})
+            await book_cache.invalidate(*book_uids)
+            await rating_histogram_cache.invalidate(*book_uids)
+            await review_list_version.bump()
+        await self._settle(batch, rejected)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[uuid.UUID, str]]:
+        """
+        Write rows in one transaction, splitting it in halves on a constraint
+        violation until the offending rows are isolated. Returns the stored rows and
+        the reasons the others were rejected.
+        """
+        try:
+            return await self._write_batch(rows)
+        except IntegrityError as e:
+            if len(rows) == 1:
+                logging.warning(f"Review {rows[0]['uid']} could not be stored: {e.orig}")
+                return [], {rows[0]["uid"]: WRITE_FAILED}
+        middle = len(rows) // 2
+        stored, rejected = await self._write(rows[:middle])
+        more_stored, more_rejected = await self._write(rows[middle:])
+        return stored + more_stored, {**rejected, **more_rejected}
+
+    async def _write_batch(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[uuid.UUID, str]]:
+        async with self.session_factory() as session:
+            # Keep the books from being deleted before the reviews referencing them
+            # commit; the lock doesn't conflict with their aggregate UPDATE
+            result = await session.exec(
+                select(Book.uid)
+                .where(Book.uid.in_({row["book_uid"] for row in rows}))
+                .order_by(Book.uid)
+                .with_for_update(read=True, key_share=True)
+            )
+            existing = set(result.all())
+            stored = [row for row in rows if row["book_uid"] in existing]
+            rejected = {row["uid"]: BOOK_NOT_FOUND for row in rows if row["book_uid"] not in existing}
+
+            if stored:
+                await session.exec(insert(Review).values(stored))
+                counts = Counter(row["book_uid"] for row in stored)
+                sums = Counter()
+                for row in stored:
+                    sums[row["book_uid"]] += row["rating"]
+                # Every book's aggregates in one statement, keyed by a CASE on its UID
+                await session.exec(
+                    update(Book)
+                    .where(Book.uid.in_(counts))
+                    .values(
+                        review_count=Book.review_count + case(counts, value=Book.uid),
+                        rating_sum=Book.rating_sum + case(sums, value=Book.uid),
+                        version=Book.version + 1,
+                    )
+                )
+                await session.commit()
+        return stored, rejected
+
+    async def _settle(self, batch: List[QueuedReview], rejected: Dict[uuid.UUID, str]) -> None:
+        """Record rejections for status lookups and wake callers waiting on the batch."""
+        if rejected:
+            try:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for review_uid, detail in rejected.items():
+                        pipe.set(REJECTED_KEY.format(review_uid), detail, ex=self.status_ttl)
+                    await pipe.execute()
+            except RedisError as e:
+                logging.warning(f"Failed to record {len(rejected)} rejected reviews: {e}")
+        for row, future in batch:
+            if future is not None and not future.done():
+                future.set_result(rejected.get(row["uid"]))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, outcome counters and flush latency."""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "queue_full": self.queue_full,
+            "stored": self.stored,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round((self.stored + self.rejected) / self.batches, 1) if self.batches else None,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self.flush_seconds_total / self.batches * 1000, 2) if self.batches else None,
+            "max_flush_ms": round(self.flush_seconds_max * 1000, 2),
+        }
+
+
+review_ingestor = ReviewIngestor(
+    queue_size=settings.REVIEW_INGEST_QUEUE_SIZE,
+    batch_size=settings.REVIEW_INGEST_BATCH_SIZE,
+    flush_interval=settings.REVIEW_INGEST_FLUSH_INTERVAL,
+    status_ttl=settings.REVIEW_INGEST_STATUS_TTL,
+)
+register_metrics("review_ingest", review_ingestor.stats)
@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import Index
 from sqlmodel import Column, Field, Relationship, SQLModel
 from pydantic import conint
 
@@ -12,6 +13,21 @@ if TYPE_CHECKING:
 
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination of the review listing; also lets the trending job read
+        # only the reviews written since its last run
+        Index("ix_reviews_created_at_uid", "created_at", "uid"),
+        # Filtered listings: equality filters keep the listing order. A rating
+        # range only bounds the leading column, so its matches are sorted
+        Index("ix_reviews_book_uid_created_at_uid",
+              "book_uid", "created_at", "uid"),
+        Index("ix_reviews_user_uid_created_at_uid",
+              "user_uid", "created_at", "uid"),
+        Index("ix_reviews_rating_created_at_uid",
+              "rating", "created_at", "uid"),
+        # Covers a book's rating histogram, counted without touching the table
+        Index("ix_reviews_book_uid_rating", "book_uid", "rating"),
+    )
 
     uid: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     rating: conint(ge=1, le=5) = Field(...,
@@ -19,18 +35,19 @@ class Review(SQLModel, table=True):
     review_text: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
     user_uid: Optional[uuid.UUID] = Field(
         default=None, foreign_key="users.uid")
+    # Reviews outlive a deleted book
     book_uid: Optional[uuid.UUID] = Field(
-        default=None, foreign_key="books.uid")
+        default=None, foreign_key="books.uid", ondelete="SET NULL")
     created_at: datetime = Field(
         default_factory=datetime.utcnow, sa_column=Column(pg.TIMESTAMP))
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(
         pg.TIMESTAMP, onupdate=datetime.utcnow))
 
-    # Relationships
+    # Relationships are never loaded implicitly; listings embed them on request
     user: Optional["User"] = Relationship(
-        back_populates="reviews", sa_relationship_kwargs={"lazy": "selectin"})
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise_on_sql"})
     book: Optional["Book"] = Relationship(
-        back_populates="reviews", sa_relationship_kwargs={"lazy": "selectin"})
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise_on_sql"})
 
     def __repr__(self) -> str:
         return f"<Review for book {self.book_uid} by user {self.user_uid}>"
@@ -1,23 +1,60 @@
 import logging
-from fastapi import APIRouter, Depends, status, HTTPException
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, Query, Response, status, HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.dependencies import RoleChecker, get_current_user
 from src.conf.database import get_db
-from auth.models import User
-from .schemas import ReviewCreateModel
+from auth.schemas import Principal
+from conf.etag import etag_matches, not_modified
+from conf.negotiation import NegotiatedResponse, NegotiatedRoute
+from conf.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .ingest import review_ingestor
+from .schemas import (
+    ReviewCreateModel,
+    ReviewExpansion,
+    ReviewFilterModel,
+    ReviewIngestReceiptModel,
+    ReviewPageModel,
+)
 from .services import ReviewService
 
 review_service = ReviewService()
-review_router = APIRouter()
+review_router = APIRouter(
+    route_class=NegotiatedRoute, default_response_class=NegotiatedResponse)
 admin_role_checker = Depends(RoleChecker(["admin"]))
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
 
 
-@review_router.get("/", response_model=list, dependencies=[admin_role_checker])
-async def get_all_reviews(session: AsyncSession = Depends(get_db)):
+@review_router.get("/", response_model=ReviewPageModel, dependencies=[admin_role_checker])
+async def get_all_reviews(
+    filters: ReviewFilterModel = Depends(),
+    expand: List[ReviewExpansion] = Query([]),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Fetch a page of reviews, newest first; pass `next_cursor` back as `cursor` for the
+    next page. `expand=user` and `expand=book` embed the reviewer and the book.
+    """
     try:
-        reviews = await review_service.get_all_reviews(session)
-        return reviews
+        # Embedded users and books can change without touching reviews, so only
+        # plain listings are validated by ETag
+        etag = None
+        if not expand:
+            etag = await review_service.get_all_reviews_etag(
+                filters.model_dump_json(exclude_none=True), limit, cursor)
+            if etag and etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        reviews, next_cursor = await review_service.get_all_reviews(
+            session, filters, limit, cursor, expand)
+        headers = {"ETag": etag} if etag else None
+        return NegotiatedResponse({"items": reviews, "next_cursor": next_cursor}, headers=headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error fetching all reviews: {str(e)}")
         raise HTTPException(
@@ -28,15 +65,23 @@ async def get_all_reviews(session: AsyncSession = Depends(get_db)):
 
 @review_router.get("/{review_uid}", response_model=ReviewCreateModel, dependencies=[user_role_checker])
 async def get_review(
-    review_uid: str, session: AsyncSession = Depends(get_db)
+    review_uid: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_db),
 ):
     try:
-        review = await review_service.get_review(review_uid, session)
-        if not review:
+        etag = await review_service.get_review_etag(review_uid, session)
+        if not etag:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Review with UID {review_uid} not found.",
             )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        review = await review_service.get_review(review_uid, session)
+        response.headers["ETag"] = etag
         return review
     except HTTPException as e:
         # Re-raise the HTTPException if it's a custom exception
@@ -53,12 +98,12 @@ async def get_review(
 async def add_review_to_books(
     book_uid: str,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_db),
 ):
     try:
         new_review = await review_service.add_review_to_book(
-            user_email=current_user.email,
+            user_uid=current_user.uid,
             review_data=review_data,
             book_uid=book_uid,
             session=session,
@@ -78,6 +123,42 @@ async def add_review_to_books(
         )
 
 
+@review_router.post(
+    "/ingest/{book_uid}",
+    response_model=ReviewIngestReceiptModel,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[user_role_checker],
+)
+async def ingest_review(
+    book_uid: uuid.UUID,
+    review_data: ReviewCreateModel,
+    response: Response,
+    wait: bool = False,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Queue a review to be written in the next batch and answer 202 with its UID;
+    follow up with `GET /reviews/ingest/{uid}`. With `wait=true` the response comes
+    after the batch commits, as 201 if the review was stored.
+    """
+    receipt = await review_ingestor.submit(
+        current_user.uid, book_uid, review_data, wait=wait)
+    if receipt["status"] == "stored":
+        response.status_code = status.HTTP_201_CREATED
+    return receipt
+
+
+@review_router.get(
+    "/ingest/{review_uid}", response_model=ReviewIngestReceiptModel, dependencies=[user_role_checker]
+)
+async def get_ingest_status(
+    review_uid: uuid.UUID,
+    session: AsyncSession = Depends(get_db),
+):
+    """Report whether a queued review has been stored, was rejected or is still pending."""
+    return await review_ingestor.get_status(review_uid, session)
+
+
 @review_router.delete(
     "/{review_uid}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -85,12 +166,12 @@ async def add_review_to_books(
 )
 async def delete_review(
     review_uid: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_db),
 ):
     try:
         await review_service.delete_review_from_book(
-            review_uid=review_uid, user_email=current_user.email, session=session
+            review_uid=review_uid, user_uid=current_user.uid, session=session
         )
         logging.info(f"Review {review_uid} deleted by user {
                      current_user.email}")
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -24,3 +25,71 @@ class ReviewCreateModel(BaseModel):
     class Config:
         orm_mode = True  # This allows Pydantic to read data from SQLAlchemy models
 
+
+
+# Filters accepted by the admin review listing; every filter is optional
+class ReviewFilterModel(BaseModel):
+    book_uid: Optional[uuid.UUID] = None
+    user_uid: Optional[uuid.UUID] = None
+    min_rating: Optional[int] = Field(None, ge=1, le=5)
+    max_rating: Optional[int] = Field(None, ge=1, le=5)
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+
+# Related records the review listing can embed on request
+class ReviewExpansion(str, Enum):
+    user = "user"
+    book = "book"
+
+
+# The reviewer, as embedded in an expanded review
+class ReviewerModel(BaseModel):
+    uid: uuid.UUID
+    username: str
+
+
+# The reviewed book, as embedded in an expanded review
+class ReviewedBookModel(BaseModel):
+    uid: uuid.UUID
+    title: str
+    author: str
+
+
+# A review with the related records asked for through `expand`
+class ReviewListItemModel(ReviewModel):
+    user: Optional[ReviewerModel] = None
+    book: Optional[ReviewedBookModel] = None
+
+
+# Schema for a page of reviews returned by keyset pagination
+class ReviewPageModel(BaseModel):
+    items: List[ReviewListItemModel]
+    next_cursor: Optional[str] = None
+
+
+# Outcome of a review submitted for write-behind ingestion
+class ReviewIngestStatus(str, Enum):
+    pending = "pending"
+    stored = "stored"
+    rejected = "rejected"
+
+
+# Receipt for a queued review; `uid` is the UID the review is stored under
+class ReviewIngestReceiptModel(BaseModel):
+    uid: uuid.UUID
+    status: ReviewIngestStatus
+    detail: Optional[str] = None
+
+
+# Number of a book's reviews with one star rating
+class RatingCountModel(BaseModel):
+    rating: int = Field(ge=1, le=5)
+    count: int
+
+
+# A book's star distribution, one entry per rating from 1 to 5
+class RatingHistogramModel(BaseModel):
+    book_uid: uuid.UUID
+    review_count: int
+    counts: List[RatingCountModel]
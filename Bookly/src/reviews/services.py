@@ -1,27 +1,100 @@
 import logging
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional
 from fastapi import status, HTTPException
+from sqlalchemy import delete, func, tuple_, update
 from sqlmodel import desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from auth.services import UserService
-from books.services import BookService
+from auth.models import User
+from conf.cache import TwoTierCache, VersionCounter
+from conf.config import settings
+from conf.etag import make_etag
+from conf.metrics import register_metrics
+from conf.pagination import DEFAULT_PAGE_SIZE, build_page, decode_cursor
+from conf.serialization import row_dicts
+from books.models import Book
+from books.services import BookService, book_cache
 from .models import Review
-from .schemas import ReviewCreateModel
+from .schemas import ReviewCreateModel, ReviewExpansion, ReviewFilterModel
 
 book_service = BookService()
-user_service = UserService()
+
+# Rating histograms keyed by book UID. Every review write must invalidate its book's entry.
+rating_histogram_cache = TwoTierCache(
+    "rating_histogram",
+    maxsize=settings.RATING_HISTOGRAM_CACHE_SIZE,
+    ttl=settings.RATING_HISTOGRAM_CACHE_TTL,
+    redis_ttl=settings.RATING_HISTOGRAM_CACHE_REDIS_TTL,
+)
+register_metrics("rating_histogram_cache", rating_histogram_cache.stats)
+
+# Version of the review listing behind its ETag. Every write that adds or removes a
+# review, or changes a listed field, must bump it after committing.
+review_list_version = VersionCounter("reviews:version")
+
+# Columns behind the `ReviewModel` schema, selected as plain rows by the list endpoint
+REVIEW_ROW_COLUMNS = (
+    Review.uid,
+    Review.rating,
+    Review.review_text,
+    Review.user_uid,
+    Review.book_uid,
+    Review.created_at,
+    Review.updated_at,
+)
+
+# Columns embedded by `expand`, shaped like `ReviewerModel` and `ReviewedBookModel`;
+# the primary key comes first
+REVIEWER_COLUMNS = (User.uid, User.username)
+REVIEWED_BOOK_COLUMNS = (Book.uid, Book.title, Book.author)
+
+
+def review_filter_conditions(filters: ReviewFilterModel) -> list:
+    """
+    Translate the filters into WHERE conditions on `reviews`.
+
+    Book, user and rating filters each lead one of the listing indexes, followed by
+    (created_at, uid), so an equality filter keeps a page an ordered index range
+    scan; the date range bounds the (created_at, uid) index itself. A rating range
+    (min_rating < max_rating) only bounds the leading rating column, so its matches
+    are sorted by (created_at, uid) before the page is cut.
+    """
+    conditions = []
+    if filters.book_uid is not None:
+        conditions.append(Review.book_uid == filters.book_uid)
+    if filters.user_uid is not None:
+        conditions.append(Review.user_uid == filters.user_uid)
+    if filters.min_rating is not None and filters.min_rating == filters.max_rating:
+        # As an equality, so the rating index returns the page in order
+        conditions.append(Review.rating == filters.min_rating)
+    else:
+        if filters.min_rating is not None:
+            conditions.append(Review.rating >= filters.min_rating)
+        if filters.max_rating is not None:
+            conditions.append(Review.rating <= filters.max_rating)
+    if filters.created_from is not None:
+        conditions.append(Review.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        conditions.append(Review.created_at <= filters.created_to)
+    return conditions
 
 
 class ReviewService:
     async def add_review_to_book(
         self,
-        user_email: str,
+        user_uid: str,
         book_uid: str,
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ):
         try:
-            # Fetch user and book using helper function
-            book, user = await self._get_user_and_book_by_email(user_email, book_uid, session)
+            book = await book_service.get_book(book_uid=book_uid, session=session)
+            if not book:
+                raise HTTPException(
+                    detail="Book not found",
+                    status_code=status.HTTP_404_NOT_FOUND,
+                )
 
             # Validate review data
             if not review_data.rating or not (1 <= review_data.rating <= 5):
@@ -30,12 +103,25 @@ class ReviewService:
                     status_code=status.HTTP_400_BAD_REQUEST,
                 )
 
-            new_review = Review(**review_data.dict(), user=user, book=book)
+            new_review = Review(
+                **review_data.dict(), user_uid=user_uid, book_uid=book.uid)
             session.add(new_review)
+            # Keep the book's rating aggregates in the review's transaction
+            await session.exec(
+                update(Book)
+                .where(Book.uid == book.uid)
+                .values(
+                    review_count=Book.review_count + 1,
+                    rating_sum=Book.rating_sum + new_review.rating,
+                    version=Book.version + 1,
+                )
+            )
             await session.commit()
+            await book_cache.invalidate(str(book.uid))
+            await rating_histogram_cache.invalidate(str(book.uid))
+            await review_list_version.bump()
 
-            logging.info(f"Review added for book {
-                         book_uid} by user {user_email}")
+            logging.info(f"Review added for book {book_uid} by user {user_uid}")
             return new_review
 
         except HTTPException as e:
@@ -69,11 +155,61 @@ class ReviewService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-    async def get_all_reviews(self, session: AsyncSession):
+    async def get_review_etag(self, review_uid: str, session: AsyncSession) -> Optional[str]:
+        """
+        Return a review's ETag from its `updated_at`, or None if it doesn't exist.
+        """
         try:
-            statement = select(Review).order_by(desc(Review.created_at))
-            result = await session.exec(statement)
-            return result.all()
+            review_uid = uuid.UUID(str(review_uid))
+        except ValueError:
+            return None
+
+        statement = select(Review.updated_at).where(Review.uid == review_uid)
+        result = await session.exec(statement)
+        updated_at = result.first()
+        return make_etag("review", review_uid, updated_at.isoformat()) if updated_at else None
+
+    async def get_all_reviews_etag(self, *variant) -> Optional[str]:
+        """
+        Return a weak ETag for a review listing from `review_list_version`, without
+        touching the database, or None if the version can't be read.
+
+        `variant` identifies the page: its filters, cursor and size.
+        """
+        version = await review_list_version.get()
+        if version is None:
+            return None
+        return make_etag("reviews", version, *variant, weak=True)
+
+    async def get_all_reviews(
+        self,
+        session: AsyncSession,
+        filters: Optional[ReviewFilterModel] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        expand: Iterable[ReviewExpansion] = (),
+    ):
+        """
+        Fetch a page of reviews as plain dicts, newest first, with the reviewer and
+        the book embedded only when asked for through `expand`.
+        """
+        try:
+            statement = select(*REVIEW_ROW_COLUMNS)
+            if filters is not None:
+                statement = statement.where(*review_filter_conditions(filters))
+            result = await session.exec(self._paginate(statement, limit, cursor))
+            reviews, next_cursor = build_page(
+                row_dicts(result), limit, lambda row: (row["created_at"], row["uid"]))
+
+            expand = set(expand)
+            if ReviewExpansion.user in expand:
+                await self._embed(reviews, "user", REVIEWER_COLUMNS, session)
+            if ReviewExpansion.book in expand:
+                await self._embed(reviews, "book", REVIEWED_BOOK_COLUMNS, session)
+            return reviews, next_cursor
+
+        except HTTPException as e:
+            raise e
 
         except Exception as e:
             logging.exception("Error fetching all reviews")
@@ -82,24 +218,135 @@ class ReviewService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    async def get_book_reviews(
+        self,
+        book_uid: uuid.UUID,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        expand: Iterable[ReviewExpansion] = (),
+    ):
+        """Fetch a page of one book's reviews as plain dicts, newest first."""
+        return await self.get_all_reviews(
+            session, ReviewFilterModel(book_uid=book_uid), limit, cursor, expand)
+
+    async def get_rating_histogram(
+        self, book_uid: uuid.UUID, session: AsyncSession, version: Optional[int] = None
+    ) -> dict:
+        """
+        Count a book's reviews per star rating, read through the histogram cache.
+
+        The counts come from one GROUP BY over ix_reviews_book_uid_rating; ratings
+        without reviews are reported with a count of zero. Entries record the book
+        version they were counted at, so once a review write has bumped it, an entry
+        cached by a read that raced the write is treated as a miss.
+        """
+        book_uid = uuid.UUID(str(book_uid))
+        key = str(book_uid)
+        histogram = await rating_histogram_cache.get(key)
+        if histogram is not None and (version is None or histogram.get("version") == version):
+            return histogram
+
+        statement = (
+            select(Review.rating, func.count())
+            .where(Review.book_uid == book_uid)
+            .group_by(Review.rating)
+        )
+        result = await session.exec(statement)
+        counts = dict(result.all())
+        histogram = {
+            "book_uid": key,
+            "version": version,
+            "review_count": sum(counts.values()),
+            "counts": [{"rating": rating, "count": counts.get(rating, 0)} for rating in range(1, 6)],
+        }
+        await rating_histogram_cache.set(key, histogram)
+        return histogram
+
+    # Keyset pagination on (created_at, uid), matching the trailing columns of every
+    # review listing index.
+    @staticmethod
+    def _paginate(statement, limit: int, cursor: Optional[str]):
+        if cursor:
+            created_at, uid = decode_cursor(
+                cursor, datetime.fromisoformat, uuid.UUID)
+            statement = statement.where(
+                tuple_(Review.created_at, Review.uid) < tuple_(created_at, uid))
+        return statement.order_by(desc(Review.created_at), desc(Review.uid)).limit(limit + 1)
+
+    @staticmethod
+    async def _embed(reviews: List[dict], relation: str, columns: tuple, session: AsyncSession) -> None:
+        """
+        Attach the related user or book rows to a page of reviews with one IN query,
+        leaving None where the reference is empty or dangling.
+        """
+        key = f"{relation}_uid"
+        uids = {review[key] for review in reviews if review[key] is not None}
+        related = {}
+        if uids:
+            result = await session.exec(select(*columns).where(columns[0].in_(uids)))
+            related = {row["uid"]: row for row in row_dicts(result)}
+        for review in reviews:
+            review[relation] = related.get(review[key])
+
     async def delete_review_from_book(
-        self, review_uid: str, user_email: str, session: AsyncSession
+        self, review_uid: str, user_uid: str, session: AsyncSession
     ):
+        """
+        Delete a user's own review and take it out of its book's rating aggregates.
+
+        On PostgreSQL the delete and the aggregate update are one statement: the
+        DELETE ... RETURNING feeds an UPDATE of the book through a data-modifying CTE.
+        """
         try:
-            # Fetch user and review
-            user = await user_service.get_user_by_email(user_email, session)
-            review = await self.get_review(review_uid, session)
+            owned = (Review.uid == review_uid) & (Review.user_uid == user_uid)
+            if session.bind.dialect.name == "postgresql":
+                deleted = (
+                    delete(Review).where(owned)
+                    .returning(Review.uid, Review.book_uid, Review.rating)
+                    .cte("deleted")
+                )
+                adjusted = (
+                    update(Book)
+                    .where(Book.uid == deleted.c.book_uid)
+                    .values(
+                        review_count=Book.review_count - 1,
+                        rating_sum=Book.rating_sum - deleted.c.rating,
+                        version=Book.version + 1,
+                    )
+                    .cte("adjusted")
+                )
+                result = await session.exec(
+                    select(deleted.c.uid, deleted.c.book_uid).add_cte(adjusted))
+            else:
+                result = await session.exec(
+                    delete(Review).where(owned).returning(Review.uid, Review.book_uid, Review.rating))
+            row = result.first()
 
-            if not review or review.user != user:
+            if not row:
                 raise HTTPException(
                     detail="You do not have permission to delete this review.",
                     status_code=status.HTTP_403_FORBIDDEN,
                 )
 
-            session.delete(review)
+            book_uid = row.book_uid
+            if book_uid and session.bind.dialect.name != "postgresql":
+                await session.exec(
+                    update(Book)
+                    .where(Book.uid == book_uid)
+                    .values(
+                        review_count=Book.review_count - 1,
+                        rating_sum=Book.rating_sum - row.rating,
+                        version=Book.version + 1,
+                    )
+                )
             await session.commit()
+            await review_list_version.bump()
+            if book_uid:
+                await book_cache.invalidate(str(book_uid))
+                await rating_histogram_cache.invalidate(str(book_uid))
 
-            logging.info(f"Review {review_uid} deleted by user {user_email}")
+            logging.info(f"Review {review_uid} deleted by user {user_uid}")
             return {"message": "Review deleted successfully"}
 
         except HTTPException as e:
@@ -112,21 +359,65 @@ class ReviewService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-    # Helper method to fetch user and book by email and book UID
-    async def _get_user_and_book_by_email(self, user_email: str, book_uid: str, session: AsyncSession):
-        book = await book_service.get_book(book_uid=book_uid, session=session)
-        user = await user_service.get_user_by_email(email=user_email, session=session)
+    async def reconcile_rating_aggregates(
+        self, session: AsyncSession, chunk_size: int = settings.RATING_RECONCILE_CHUNK_SIZE
+    ) -> list[str]:
+        """
+        Recompute every book's review_count and rating_sum from its reviews and
+        repair the books that drifted. Returns the UIDs of the repaired books.
 
-        if not book:
-            raise HTTPException(
-                detail="Book not found",
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        Books are reconciled `chunk_size` at a time in uid order, one transaction per
+        chunk. Each chunk's book rows are locked before its reviews are counted:
+        review writes update the same rows, so none can land between computing the
+        totals and writing them back, and writes to other books are never held up.
+        """
+        books = Book.__table__
+        repaired = []
+        last_uid = None
+        while True:
+            statement = select(Book.uid).order_by(Book.uid).limit(chunk_size)
+            if last_uid is not None:
+                statement = statement.where(Book.uid > last_uid)
+            chunk = (await session.exec(statement)).all()
+            if not chunk:
+                break
+            last_uid = chunk[-1]
 
-        if not user:
-            raise HTTPException(
-                detail="User not found",
-                status_code=status.HTTP_404_NOT_FOUND,
+            await session.exec(
+                select(Book.uid).where(Book.uid.in_(chunk)).order_by(Book.uid).with_for_update())
+            counted = books.alias("counted")
+            actual = (
+                select(
+                    counted.c.uid,
+                    func.count(Review.uid).label("review_count"),
+                    func.coalesce(func.sum(Review.rating), 0).label("rating_sum"),
+                )
+                .select_from(counted)
+                .outerjoin(Review, Review.book_uid == counted.c.uid)
+                .where(counted.c.uid.in_(chunk))
+                .group_by(counted.c.uid)
+                .subquery()
             )
+            statement = (
+                update(books)
+                .where(books.c.uid == actual.c.uid)
+                .where(
+                    (books.c.review_count != actual.c.review_count)
+                    | (books.c.rating_sum != actual.c.rating_sum)
+                )
+                .values(
+                    review_count=actual.c.review_count,
+                    rating_sum=actual.c.rating_sum,
+                    version=books.c.version + 1,
+                )
+                .returning(books.c.uid)
+            )
+            result = await session.exec(statement)
+            fixed = [str(book_uid) for book_uid in result.scalars().all()]
+            await session.commit()
+            await book_cache.invalidate(*fixed)
+            repaired.extend(fixed)
 
-        return book, user
+        if repaired:
+            logging.warning(f"Repaired rating aggregates for {len(repaired)} books")
+        return repaired
@@ -0,0 +1,211 @@
+import asyncio
+import bisect
+import heapq
+import time
+import uuid
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.broadcast import Broadcast
+from conf.config import settings
+from conf.metrics import register_metrics
+from conf.redis import redis_client
+from .models import BookTag, Tag
+
+# Channel carrying index updates from the worker that made a tag change to the others
+UPDATES_CHANNEL = "tags:autocomplete:updates"
+
+# Shortest query the trigram index on tags.name can serve; shorter queries only
+# match prefixes
+TRIGRAM_MIN_LENGTH = 3
+
+# Sorts after every character a tag name can continue a prefix with
+_PREFIX_END = "\U0010ffff"
+
+# A suggestion: tag UID, name and the number of books using the tag
+Suggestion = Tuple[uuid.UUID, str, int]
+
+
+def fold(name: str) -> str:
+    """Case-insensitive form of a tag name that the index is sorted and matched on."""
+    return name.casefold()
+
+
+class TagAutocompleteIndex:
+    """
+    Per-worker prefix index over tag names, ranked by how many books use each tag.
+
+    Names are kept as a sorted list of (folded name, UID) pairs, so the tags starting
+    with a prefix are one contiguous slice found with two bisections. Tag changes are
+    applied in place with `update`, which also broadcasts them to the other workers,
+    and results are memoized per query until the next change. The index is reloaded
+    from the database after `max_age` seconds, or after the update subscription was
+    interrupted, to pick up anything it missed.
+    """
+
+    def __init__(self, cache_size: int, max_age: float, client=redis_client) -> None:
+        self.max_age = max_age
+        self._entries: List[Tuple[str, uuid.UUID]] = []
+        self._names: Dict[uuid.UUID, str] = {}
+        self._counts: Dict[uuid.UUID, int] = {}
+        self._loaded_at: Optional[float] = None
+        # Updates received while a load is reading the table, applied after it
+        self._pending: Optional[List[Sequence[Any]]] = None
+        self._lock = asyncio.Lock()
+        self._search = lru_cache(maxsize=cache_size)(self._search_uncached)
+        self.broadcast = Broadcast(
+            UPDATES_CHANNEL,
+            on_message=self._apply,
+            on_reset=self._expire,
+            max_backoff=max_age,
+            client=client,
+        )
+        self.loads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Load the tag names and usage counts in one query, unless already loaded."""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            self._pending = []
+            try:
+                statement = (
+                    select(Tag.uid, Tag.name, func.count(BookTag.book_id))
+                    .outerjoin(BookTag, BookTag.tag_id == Tag.uid)
+                    .group_by(Tag.uid, Tag.name)
+                )
+                result = await session.exec(statement)
+                rows = result.all()
+                self._names = {uid: name for uid, name, _ in rows}
+                self._counts = {uid: count for uid, _, count in rows}
+                self._entries = sorted((fold(name), uid) for uid, name, _ in rows)
+                # A usage change that the query already saw is counted twice here;
+                # counts only rank suggestions and are corrected by the next load
+                for operation in self._pending:
+                    self._apply_operation(operation)
+            finally:
+                self._pending = None
+            self._search.cache_clear()
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def search(self, prefix: str, limit: int) -> Tuple[Suggestion, ...]:
+        """
+        Return up to `limit` tags whose folded name starts with `prefix`, most used
+        first, then alphabetically. `prefix` must already be folded.
+        """
+        return self._search(prefix, limit)
+
+    def _search_uncached(self, prefix: str, limit: int) -> Tuple[Suggestion, ...]:
+        lo = bisect.bisect_left(self._entries, (prefix,))
+        hi = bisect.bisect_left(self._entries, (prefix + _PREFIX_END,), lo)
+        counts = self._counts
+        best = heapq.nsmallest(
+            limit, islice(self._entries, lo, hi), key=lambda entry: (-counts[entry[1]], entry[0]))
+        return tuple((uid, self._names[uid], counts[uid]) for _, uid in best)
+
+    def contains(self, text: str, limit: int, exclude: Iterable[uuid.UUID] = ()) -> List[Suggestion]:
+        """
+        Return up to `limit` tags whose folded name contains `text`, most used first.
+
+        A full scan; the fallback for databases without trigram indexes.
+        """
+        exclude = set(exclude)
+        counts = self._counts
+        best = heapq.nsmallest(
+            limit,
+            (entry for entry in self._entries if text in entry[0] and entry[1] not in exclude),
+            key=lambda entry: (-counts[entry[1]], entry[0]),
+        )
+        return [(uid, self._names[uid], counts[uid]) for _, uid in best]
+
+    def book_count(self, tag_uid: uuid.UUID) -> int:
+        return self._counts.get(tag_uid, 0)
+
+    async def update(self, operations: List[Sequence[Any]]) -> None:
+        """
+        Apply tag changes to this worker's index and broadcast them to the others.
+
+        Operations are `("upsert", uid, name)` for a created or renamed tag,
+        `("remove", uid)` for a deleted one and `("usage", uid, delta)` when links
+        to books were added or removed.
+        """
+        if not operations:
+            return
+        operations = [[str(value) if isinstance(value, uuid.UUID) else value for value in operation]
+                      for operation in operations]
+        self._apply(operations)
+        await self.broadcast.publish(operations)
+
+    def _apply(self, operations: List[Sequence[Any]]) -> None:
+        if self._pending is not None:
+            self._pending.extend(operations)
+            return
+        if self._loaded_at is None:
+            # The next load reads the change from the database
+            return
+        for operation in operations:
+            self._apply_operation(operation)
+        self._search.cache_clear()
+
+    def _apply_operation(self, operation: Sequence[Any]) -> None:
+        kind, uid, *args = operation
+        uid = uuid.UUID(uid)
+        if kind == "upsert":
+            self._remove_entry(uid)
+            self._names[uid] = args[0]
+            self._counts.setdefault(uid, 0)
+            bisect.insort(self._entries, (fold(args[0]), uid))
+        elif kind == "remove":
+            self._remove_entry(uid)
+            self._names.pop(uid, None)
+            self._counts.pop(uid, None)
+        elif kind == "usage" and uid in self._counts:
+            self._counts[uid] = max(self._counts[uid] + args[0], 0)
+
+    def _remove_entry(self, uid: uuid.UUID) -> None:
+        name = self._names.get(uid)
+        if name is None:
+            return
+        i = bisect.bisect_left(self._entries, (fold(name), uid))
+        if i < len(self._entries) and self._entries[i][1] == uid:
+            del self._entries[i]
+
+    def _expire(self) -> None:
+        self._loaded_at = None
+
+    async def start(self) -> None:
+        """Start receiving the other workers' updates."""
+        await self.broadcast.start()
+
+    async def stop(self) -> None:
+        await self.broadcast.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size, load count and query cache counters."""
+        cache = self._search.cache_info()
+        return {
+            "tags": len(self._entries),
+            "loaded": self.loaded,
+            "loads": self.loads,
+            "subscribed": self.broadcast.subscribed,
+            "cache_hits": cache.hits,
+            "cache_misses": cache.misses,
+            "cache_size": cache.currsize,
+        }
+
+
+tag_autocomplete = TagAutocompleteIndex(
+    cache_size=settings.TAG_AUTOCOMPLETE_CACHE_SIZE,
+    max_age=settings.TAG_AUTOCOMPLETE_MAX_AGE,
+)
+register_metrics("tag_autocomplete", tag_autocomplete.stats)
@@ -0,0 +1,142 @@
+import asyncio
+import time
+import uuid
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+import orjson
+from sqlmodel import desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.broadcast import Broadcast
+from conf.config import settings
+from conf.etag import make_etag
+from conf.metrics import register_metrics
+from conf.negotiation import packb
+from conf.redis import redis_client
+from conf.serialization import row_dicts
+from .models import Tag
+
+# Channel on which tag writes tell every worker to drop its snapshot
+INVALIDATION_CHANNEL = "tags:catalog:invalidate"
+
+
+class TagCatalogSnapshot(NamedTuple):
+    """
+    The tag list as of one read of the tags table. Never modified once built.
+    """
+    tags: Tuple[Dict[str, Any], ...]
+    uids_by_name: Mapping[str, uuid.UUID]
+    names_by_uid: Mapping[uuid.UUID, str]
+    etag: str
+    json_body: bytes
+    msgpack_body: bytes
+    built_at: float
+
+
+class TagCatalog:
+    """
+    Per-worker snapshot of the tag catalog behind `GET /tags/`.
+
+    The snapshot holds the response body already serialized as JSON and as
+    MessagePack, and mappings between tag names and UIDs. Tag writes call `invalidate`, which drops
+    the local snapshot and publishes on Redis so every other worker drops its own;
+    the next read rebuilds it from one query. If the subscription is down a
+    snapshot is still rebuilt once it is older than `max_age`.
+    """
+
+    def __init__(self, max_age: float, client=redis_client) -> None:
+        self.max_age = max_age
+        self._snapshot: Optional[TagCatalogSnapshot] = None
+        # Bumped by every invalidation, so a rebuild that raced one is not kept
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.broadcast = Broadcast(
+            INVALIDATION_CHANNEL,
+            on_message=lambda _: self._drop(),
+            # Anything published while unsubscribed was missed
+            on_reset=self._drop,
+            max_backoff=max_age,
+            client=client,
+        )
+
+        self.hits = 0
+        self.rebuilds = 0
+        self.invalidations = 0
+        self.last_rebuild_seconds = 0.0
+
+    async def get(self, session: AsyncSession) -> TagCatalogSnapshot:
+        """Return the current snapshot, rebuilding it if it was invalidated or expired."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.max_age:
+            self.hits += 1
+            return snapshot
+
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.built_at < self.max_age:
+                self.hits += 1
+                return snapshot
+
+            generation = self._generation
+            snapshot = await self._build(session)
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    async def invalidate(self) -> None:
+        """Drop this worker's snapshot and tell the other workers to drop theirs."""
+        self._drop()
+        await self.broadcast.publish()
+
+    def _drop(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+        self.invalidations += 1
+
+    async def _build(self, session: AsyncSession) -> TagCatalogSnapshot:
+        started = time.perf_counter()
+        statement = select(Tag.uid, Tag.name, Tag.created_at, Tag.updated_at).order_by(
+            desc(Tag.created_at))
+        result = await session.exec(statement)
+        rows = row_dicts(result)
+
+        # Weak validator from the tag count and the last modification; adding or
+        # renaming a tag moves max(updated_at), deleting one changes the count
+        last_modified = max((row.pop("updated_at") for row in rows), default=None)
+        etag = make_etag(
+            "tags", len(rows), last_modified.isoformat() if last_modified else None, weak=True)
+        snapshot = TagCatalogSnapshot(
+            tags=tuple(rows),
+            uids_by_name=MappingProxyType({row["name"]: row["uid"] for row in rows}),
+            names_by_uid=MappingProxyType({row["uid"]: row["name"] for row in rows}),
+            etag=etag,
+            json_body=orjson.dumps(rows),
+            msgpack_body=packb(rows),
+            built_at=time.monotonic(),
+        )
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - started
+        return snapshot
+
+    async def start(self) -> None:
+        """Start listening for invalidations published by other workers."""
+        await self.broadcast.start()
+
+    async def stop(self) -> None:
+        await self.broadcast.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot size, hit and rebuild counters."""
+        snapshot = self._snapshot
+        return {
+            "tags": len(snapshot.tags) if snapshot else None,
+            "age_seconds": round(time.monotonic() - snapshot.built_at, 1) if snapshot else None,
+            "subscribed": self.broadcast.subscribed,
+            "hits": self.hits,
+            "rebuilds": self.rebuilds,
+            "invalidations": self.invalidations,
+            "last_rebuild_ms": round(self.last_rebuild_seconds * 1000, 2),
+        }
+
+
+tag_catalog = TagCatalog(max_age=settings.TAG_CATALOG_MAX_AGE)
+register_metrics("tag_catalog", tag_catalog.stats)
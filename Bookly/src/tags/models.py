@@ -0,0 +1,2 @@
+# Tag is declared next to Book because both sides share the BookTag link model
+from books.models import BookTag, Tag  # noqa: F401
@@ -0,0 +1,200 @@
+import logging
+import uuid
+from typing import Dict, Iterable, List, Set, Tuple
+import numpy as np
+from redis.exceptions import RedisError
+from scipy import sparse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from conf.config import settings
+from conf.redis import redis_client
+from .models import BookTag
+
+# Hash of tag UID -> number of books using the tag
+RELATED_USAGE_KEY = "tags:related:usage"
+# Per tag: hash of co-occurring tag UID -> number of books carrying both
+RELATED_COOCCURRENCE_KEY = "tags:related:cooccurrence:{}"
+# Per tag: sorted set of its top-k related tag UIDs, scored by Jaccard similarity
+RELATED_TOP_KEY = "tags:related:top:{}"
+RELATED_LOCK_KEY = "tags:related:lock"
+
+
+def cooccurrence_matrix(book_positions: np.ndarray, tag_positions: np.ndarray, n_books: int,
+                        n_tags: int) -> Tuple[sparse.coo_matrix, np.ndarray]:
+    """
+    Return the off-diagonal tag x tag co-occurrence counts and each tag's book count,
+    from parallel arrays of (book, tag) link positions.
+
+    The counts are `B.T @ B` for the sparse book x tag incidence matrix `B`.
+    """
+    incidence = sparse.csr_matrix(
+        (np.ones(len(tag_positions), dtype=np.int32), (book_positions, tag_positions)),
+        shape=(n_books, n_tags),
+    )
+    counts = (incidence.T @ incidence).tocoo()
+    off_diagonal = counts.row != counts.col
+    pairs = sparse.coo_matrix(
+        (counts.data[off_diagonal], (counts.row[off_diagonal], counts.col[off_diagonal])),
+        shape=(n_tags, n_tags),
+    )
+    return pairs, np.bincount(tag_positions, minlength=n_tags)
+
+
+def jaccard(counts: np.ndarray, usage_a: np.ndarray, usage_b: np.ndarray) -> np.ndarray:
+    """Jaccard similarity of two tags' book sets from their overlap and sizes."""
+    return counts / (usage_a + usage_b - counts)
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the `k` highest scores within each row, all rows at once.
+
+    Entries are sorted by row and descending score; an entry's rank in its row is its
+    distance from the row's first entry.
+    """
+    order = np.lexsort((-scores, rows))
+    sorted_rows = rows[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows, side="left")
+    return order[rank < k]
+
+
+async def rebuild_related_tags(session: AsyncSession, client=redis_client) -> int:
+    """
+    Recompute every tag's co-occurrence counts and top-k related tags from
+    `book_tags` and swap them into Redis. Returns the number of tags.
+
+    Links added while the rebuild runs may be missed until the next one.
+    """
+    lock = client.lock(RELATED_LOCK_KEY, timeout=settings.RELATED_TAGS_REBUILD_INTERVAL)
+    if not await lock.acquire(blocking=False):
+        logging.info("Related tags rebuild already running, skipping")
+        return 0
+
+    try:
+        result = await session.exec(select(BookTag.book_id, BookTag.tag_id))
+        links = result.all()
+
+        book_index: Dict[uuid.UUID, int] = {}
+        tag_index: Dict[uuid.UUID, int] = {}
+        book_positions = np.fromiter(
+            (book_index.setdefault(book_uid, len(book_index)) for book_uid, _ in links),
+            dtype=np.int64, count=len(links))
+        tag_positions = np.fromiter(
+            (tag_index.setdefault(tag_uid, len(tag_index)) for _, tag_uid in links),
+            dtype=np.int64, count=len(links))
+        tag_uids = [str(tag_uid) for tag_uid in tag_index]
+
+        pairs, usage = cooccurrence_matrix(
+            book_positions, tag_positions, len(book_index), len(tag_index))
+        scores = jaccard(pairs.data, usage[pairs.row], usage[pairs.col])
+        eligible = np.flatnonzero(pairs.data >= settings.RELATED_TAGS_MIN_COOCCURRENCE)
+        top = eligible[top_k(pairs.row[eligible], scores[eligible], settings.RELATED_TAGS_TOP_K)]
+
+        rows = pairs.tocsr()
+        previous = await client.hkeys(RELATED_USAGE_KEY)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(RELATED_USAGE_KEY)
+            for tag_uid in previous:
+                pipe.delete(RELATED_COOCCURRENCE_KEY.format(tag_uid), RELATED_TOP_KEY.format(tag_uid))
+            if tag_uids:
+                pipe.hset(RELATED_USAGE_KEY, mapping=dict(zip(tag_uids, usage.tolist())))
+            for i, tag_uid in enumerate(tag_uids):
+                start, end = rows.indptr[i], rows.indptr[i + 1]
+                if start < end:
+                    pipe.hset(RELATED_COOCCURRENCE_KEY.format(tag_uid), mapping={
+                        tag_uids[j]: count
+                        for j, count in zip(rows.indices[start:end].tolist(), rows.data[start:end].tolist())
+                    })
+            for i in top.tolist():
+                pipe.zadd(RELATED_TOP_KEY.format(tag_uids[pairs.row[i]]),
+                          {tag_uids[pairs.col[i]]: float(scores[i])})
+            await pipe.execute()
+
+        logging.info(f"Related tags rebuilt from {len(links)} links, {len(tag_uids)} tags")
+        return len(tag_uids)
+    finally:
+        await lock.release()
+
+
+async def record_links(
+    book_tags: Dict[uuid.UUID, Set[uuid.UUID]],
+    linked: Iterable[Tuple[uuid.UUID, uuid.UUID]],
+    client=redis_client,
+) -> None:
+    """
+    Fold newly added (book, tag) links into the co-occurrence counts and recompute the
+    top-k lists of the tags involved, instead of rebuilding everything.
+
+    `book_tags` holds each affected book's tags including the new ones. Lists of
+    tags that merely neighbour an affected tag are refreshed by the next rebuild.
+    Redis failures are logged, not raised; the next rebuild repairs the counts.
+    """
+    new_tags: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+    for book_uid, tag_uid in linked:
+        new_tags.setdefault(book_uid, set()).add(tag_uid)
+    if not new_tags:
+        return
+
+    usage_deltas: Dict[str, int] = {}
+    pair_deltas: Dict[Tuple[str, str], int] = {}
+    for book_uid, added in new_tags.items():
+        existing = book_tags.get(book_uid, set()) - added
+        added = sorted(str(tag_uid) for tag_uid in added)
+        for i, tag_uid in enumerate(added):
+            usage_deltas[tag_uid] = usage_deltas.get(tag_uid, 0) + 1
+            # Each new pair once: with the book's earlier tags and the later new ones
+            for other in [str(tag) for tag in existing] + added[i + 1:]:
+                for pair in ((tag_uid, other), (other, tag_uid)):
+                    pair_deltas[pair] = pair_deltas.get(pair, 0) + 1
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for tag_uid, delta in usage_deltas.items():
+                pipe.hincrby(RELATED_USAGE_KEY, tag_uid, delta)
+            for (tag_uid, other), delta in pair_deltas.items():
+                pipe.hincrby(RELATED_COOCCURRENCE_KEY.format(tag_uid), other, delta)
+            await pipe.execute()
+        await _refresh_top({tag_uid for tag_uid, _ in pair_deltas}, client)
+    except RedisError as e:
+        logging.warning(f"Related tags not updated for {len(new_tags)} books: {e}")
+
+
+async def _refresh_top(tag_uids: Set[str], client) -> None:
+    """Recompute the top-k lists of some tags from their co-occurrence rows."""
+    if not tag_uids:
+        return
+    tag_uids = list(tag_uids)
+    async with client.pipeline(transaction=False) as pipe:
+        for tag_uid in tag_uids:
+            pipe.hgetall(RELATED_COOCCURRENCE_KEY.format(tag_uid))
+        rows = await pipe.execute()
+
+    usage_uids = list(set(tag_uids).union(*rows))
+    usage = dict(zip(usage_uids, await client.hmget(RELATED_USAGE_KEY, usage_uids)))
+
+    k = settings.RELATED_TAGS_TOP_K
+    async with client.pipeline(transaction=False) as pipe:
+        for tag_uid, row in zip(tag_uids, rows):
+            neighbours = [other for other, count in row.items()
+                          if int(count) >= settings.RELATED_TAGS_MIN_COOCCURRENCE]
+            pipe.delete(RELATED_TOP_KEY.format(tag_uid))
+            if not neighbours:
+                continue
+            counts = np.array([int(row[other]) for other in neighbours], dtype=np.float64)
+            # A tag uses at least as many books as it shares; also covers usage
+            # missing after a concurrent rebuild
+            scores = jaccard(
+                counts,
+                np.maximum(float(usage[tag_uid] or 0), counts),
+                np.maximum([float(usage[other] or 0) for other in neighbours], counts),
+            )
+            best = np.argsort(-scores, kind="stable")[:k]
+            pipe.zadd(RELATED_TOP_KEY.format(tag_uid),
+                      {neighbours[i]: float(scores[i]) for i in best.tolist()})
+        await pipe.execute()
+
+
+async def get_related_tag_uids(tag_uid: uuid.UUID, limit: int,
+                               client=redis_client) -> List[Tuple[str, float]]:
+    """Return up to `limit` `(tag_uid, score)` pairs, most related first."""
+    return await client.zrevrange(RELATED_TOP_KEY.format(tag_uid), 0, limit - 1, withscores=True)
@@ -1,16 +1,43 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.dependencies import RoleChecker
 from src.books.schemas import Book
 from conf.database import get_db
-from .schemas import TagAddModel, TagCreateModel, TagModel
+from conf.etag import etag_matches, not_modified
+from conf.negotiation import NegotiatedResponse, NegotiatedRoute, prerendered_response
+from .schemas import (
+    RelatedTagModel,
+    TagAddModel,
+    TagBulkAddItem,
+    TagBulkAddReport,
+    TagCreateModel,
+    TagModel,
+    TagSuggestionModel,
+)
 from .services import TagService
 
-tags_router = APIRouter(prefix="/tags", tags=["Tags"])
+tags_router = APIRouter(
+    prefix="/tags",
+    tags=["Tags"],
+    route_class=NegotiatedRoute,
+    default_response_class=NegotiatedResponse,
+)
 tag_service = TagService()
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
 
+# Most books a single bulk tagging request may change
+BULK_TAG_LIMIT = 1000
+
+# Suggestions returned by autocomplete, by default and at most
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Related tags returned, by default and at most
+RELATED_LIMIT = 10
+MAX_RELATED_LIMIT = 50
+
 
 @tags_router.get(
     "/",
@@ -18,16 +45,45 @@ user_role_checker = Depends(RoleChecker(["user", "admin"]))
     status_code=status.HTTP_200_OK,
     dependencies=[user_role_checker],
 )
-async def get_all_tags(session: AsyncSession = Depends(get_db)) -> List[TagModel]:
+async def get_all_tags(
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_db),
+) -> List[TagModel]:
     """
-    Retrieve all tags.
+    Retrieve all tags. Answers 304 when the client's ETag is still current.
+
+    Served from this worker's catalog snapshot, whose body is already serialized.
     """
-    tags = await tag_service.get_tags(session)
-    if not tags:
+    catalog = await tag_service.get_tag_catalog(session)
+    if etag_matches(if_none_match, catalog.etag):
+        return not_modified(catalog.etag)
+
+    if not catalog.tags:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No tags found."
         )
-    return tags
+    return prerendered_response(
+        catalog.json_body, catalog.msgpack_body, headers={"ETag": catalog.etag})
+
+
+@tags_router.get(
+    "/autocomplete",
+    response_model=List[TagSuggestionModel],
+    status_code=status.HTTP_200_OK,
+    dependencies=[user_role_checker],
+)
+async def autocomplete_tags(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=MAX_AUTOCOMPLETE_LIMIT),
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Suggest tags starting with `q`, case-insensitively, ranked by how many books use
+    them. Queries of three or more characters also match inside tag names.
+    """
+    suggestions = await tag_service.autocomplete(q, limit, session)
+    # Rows are already shaped like the response model
+    return NegotiatedResponse(suggestions)
 
 
 @tags_router.post(
@@ -80,6 +136,49 @@ async def add_tags_to_book(
         )
 
 
+@tags_router.post(
+    "/books",
+    response_model=TagBulkAddReport,
+    status_code=status.HTTP_200_OK,
+    dependencies=[user_role_checker],
+)
+async def bulk_add_tags(
+    items: List[TagBulkAddItem] = Body(..., max_length=BULK_TAG_LIMIT),
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Add tags to many books at once. Creates new tags if they don't exist; unknown
+    book UIDs are reported, not fatal.
+    """
+    try:
+        return await tag_service.bulk_add_tags(items, session)
+    except HTTPException as e:
+        raise e
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while adding tags to the books.",
+        )
+
+
+@tags_router.get(
+    "/{tag_uid}/related",
+    response_model=List[RelatedTagModel],
+    status_code=status.HTTP_200_OK,
+    dependencies=[user_role_checker],
+)
+async def get_related_tags(
+    tag_uid: uuid.UUID,
+    limit: int = Query(RELATED_LIMIT, ge=1, le=MAX_RELATED_LIMIT),
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieve the tags most often used on the same books as this one, most related first.
+    """
+    related = await tag_service.get_related_tags(tag_uid, limit, session)
+    return NegotiatedResponse(related)
+
+
 @tags_router.put(
     "/{tag_uid}",
     response_model=TagModel,
@@ -16,3 +16,28 @@ class TagCreateModel(BaseModel):
 
 class TagAddModel(BaseModel):
     tags: List[TagCreateModel]
+
+
+# A tag suggested by autocomplete, with the number of books using it
+class TagSuggestionModel(BaseModel):
+    uid: uuid.UUID
+    name: str
+    book_count: int
+
+
+# A tag often used on the same books as another, with their Jaccard similarity
+class RelatedTagModel(BaseModel):
+    uid: uuid.UUID
+    name: str
+    score: float
+
+
+# Tags to add to one book in a bulk tagging request
+class TagBulkAddItem(TagAddModel):
+    book_uid: uuid.UUID
+
+
+# Result of a bulk tagging request
+class TagBulkAddReport(BaseModel):
+    tagged: List[uuid.UUID]
+    not_found: List[uuid.UUID]
@@ -1,36 +1,107 @@
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
 from fastapi import HTTPException, status
-from sqlmodel import desc, select
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from books.services import BookService
-from .models import Tag
-from .schemas import TagAddModel, TagCreateModel
+from books.loading import tag_load_options
+from books.models import Book
+from books.services import BOOK_ROW_COLUMNS, BookService, book_cache, book_row
+from books.tag_index import book_tag_index
+from .autocomplete import TRIGRAM_MIN_LENGTH, fold, tag_autocomplete
+from .catalog import TagCatalogSnapshot, tag_catalog
+from .models import BookTag, Tag
+from .related import get_related_tag_uids, record_links
+from .schemas import TagAddModel, TagBulkAddItem, TagCreateModel
 
 book_service = BookService()
 
 
+def _insert(session: AsyncSession, model):
+    """INSERT for the session's dialect, which supports ON CONFLICT DO NOTHING."""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
 class TagService:
     """Service class to manage tags and their association with books."""
 
-    async def get_tags(self, session: AsyncSession) -> list[Tag]:
+    async def get_tag_catalog(self, session: AsyncSession) -> TagCatalogSnapshot:
         """
-        Retrieve all tags ordered by creation date (latest first).
+        Return this worker's snapshot of all tags, ordered by creation date (latest first).
         """
         try:
-            statement = select(Tag).order_by(desc(Tag.created_at))
-            result = await session.exec(statement)
-            return result.all()
+            return await tag_catalog.get(session)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to fetch tags.",
             ) from e
 
-    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession) -> Tag:
+    async def autocomplete(self, query: str, limit: int, session: AsyncSession) -> List[dict]:
         """
-        Retrieve a tag by its unique identifier.
+        Suggest tags whose name starts with the query, case-insensitively, most used
+        first. Queries of at least three characters are topped up with tags that
+        contain the query elsewhere in their name.
         """
         try:
-            statement = select(Tag).where(Tag.uid == tag_uid)
+            prefix = fold(query.strip())
+            await tag_autocomplete.ensure_loaded(session)
+            suggestions = list(tag_autocomplete.search(prefix, limit))
+            if len(suggestions) < limit and len(prefix) >= TRIGRAM_MIN_LENGTH:
+                suggestions += await self._infix_suggestions(
+                    prefix, limit - len(suggestions), {suggestion[0] for suggestion in suggestions}, session)
+            return [{"uid": uid, "name": name, "book_count": count} for uid, name, count in suggestions]
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to suggest tags.",
+            ) from e
+
+    async def get_related_tags(self, tag_uid: uuid.UUID, limit: int, session: AsyncSession) -> List[dict]:
+        """
+        Return the tags most often used on the same books as the given tag, with their
+        Jaccard similarity to it, most related first.
+
+        The lists are precomputed in Redis; names come from the tag catalog snapshot,
+        which also drops tags deleted since the lists were built.
+        """
+        try:
+            catalog = await tag_catalog.get(session)
+            if tag_uid not in catalog.names_by_uid:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Tag with UID {tag_uid} not found.",
+                )
+            related = []
+            for related_uid, score in await get_related_tag_uids(tag_uid, limit):
+                related_uid = uuid.UUID(related_uid)
+                if related_uid in catalog.names_by_uid:
+                    related.append({
+                        "uid": related_uid,
+                        "name": catalog.names_by_uid[related_uid],
+                        "score": score,
+                    })
+            return related
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to fetch related tags.",
+            ) from e
+
+    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession, profile: str = "list") -> Tag:
+        """
+        Retrieve a tag by its unique identifier, loading the given load profile.
+        """
+        try:
+            statement = select(Tag).where(Tag.uid == tag_uid).options(
+                *tag_load_options(profile))
             result = await session.exec(statement)
             tag = result.first()
             if not tag:
@@ -50,7 +121,8 @@ class TagService:
         Retrieve a tag by its name.
         """
         try:
-            statement = select(Tag).where(Tag.name == tag_name)
+            statement = select(Tag).where(Tag.name == tag_name).options(
+                *tag_load_options("list"))
             result = await session.exec(statement)
             return result.one_or_none()
         except Exception as e:
@@ -59,32 +131,39 @@ class TagService:
                 detail="Failed to fetch tag by name.",
             ) from e
 
-    async def add_tags_to_book(self, book_uid: str, tag_data: TagAddModel, session: AsyncSession) -> object:
+    async def add_tags_to_book(self, book_uid: str, tag_data: TagAddModel, session: AsyncSession) -> dict:
         """
         Associate multiple tags with a book. Creates new tags if they don't exist.
+
+        The book is looked up by the UPDATE that bumps its version, so apart from
+        resolving the tag names this is one statement for the book and one for the
+        links. Returns the book as a plain dict.
         """
         try:
-            book = await book_service.get_book(book_uid=book_uid, session=session)
+            result = await session.exec(
+                update(Book)
+                .where(Book.uid == book_uid)
+                .values(version=Book.version + 1)
+                .returning(*BOOK_ROW_COLUMNS)
+            )
+            book = result.mappings().first()
             if not book:
+                await session.rollback()
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Book with UID {book_uid} not found.",
                 )
 
-            # Add existing or create new tags
-            new_tags = []
-            for tag_item in tag_data.tags:
-                tag = await self.get_tag_by_name(tag_item.name, session)
-                if not tag:
-                    tag = Tag(name=tag_item.name)
-                    new_tags.append(tag)
-                book.tags.append(tag)
-
-            session.add_all(new_tags)
-            session.add(book)
+            tag_uids, created = await self._resolve_tags([tag.name for tag in tag_data.tags], session)
+            linked = await self._link_tags(
+                {(book["uid"], tag_uid) for tag_uid in tag_uids.values()}, session)
+            book_tags = await self._book_tags({book["uid"]} if linked else set(), session)
             await session.commit()
-            await session.refresh(book)
-            return book
+            await book_cache.invalidate(str(book["uid"]))
+            await self._tags_linked(created, linked, book_tags, {book["uid"]: book["created_at"]})
+            return book_row(dict(book))
+        except HTTPException:
+            raise
         except Exception as e:
             await session.rollback()
             raise HTTPException(
@@ -92,6 +171,54 @@ class TagService:
                 detail="Failed to associate tags with the book.",
             ) from e
 
+    async def bulk_add_tags(self, items: List[TagBulkAddItem], session: AsyncSession) -> dict:
+        """
+        Add tags to many books in one transaction. Creates new tags if they don't exist.
+
+        The books are locked in uid order and their versions bumped in one UPDATE,
+        every tag name is resolved in one upsert, and the links are written in one
+        multi-row insert. Unknown book UIDs are reported, not fatal.
+        """
+        try:
+            book_uids = {item.book_uid for item in items}
+            # Concurrent jobs over overlapping books lock them in the same order, so
+            # they wait for each other instead of deadlocking
+            result = await session.exec(
+                select(Book.uid, Book.created_at)
+                .where(Book.uid.in_(book_uids))
+                .order_by(Book.uid)
+                .with_for_update()
+            )
+            created_at = dict(result.all())
+            tagged = set(created_at)
+            if tagged:
+                await session.exec(
+                    update(Book).where(Book.uid.in_(tagged)).values(version=Book.version + 1))
+
+            # Only tags for existing books are created
+            tag_uids, created = await self._resolve_tags(
+                (tag.name for item in items if item.book_uid in tagged for tag in item.tags), session)
+
+            linked = await self._link_tags(
+                {(item.book_uid, tag_uids[tag.name])
+                 for item in items if item.book_uid in tagged for tag in item.tags},
+                session,
+            )
+            book_tags = await self._book_tags({book_uid for book_uid, _ in linked}, session)
+            await session.commit()
+            await book_cache.invalidate(*(str(book_uid) for book_uid in tagged))
+            await self._tags_linked(created, linked, book_tags, created_at)
+            return {
+                "tagged": list(tagged),
+                "not_found": [book_uid for book_uid in book_uids if book_uid not in tagged],
+            }
+        except Exception as e:
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to associate tags with the books.",
+            ) from e
+
     async def add_tag(self, tag_data: TagCreateModel, session: AsyncSession) -> Tag:
         """
         Create a new tag if it doesn't already exist.
@@ -107,6 +234,8 @@ class TagService:
             new_tag = Tag(name=tag_data.name)
             session.add(new_tag)
             await session.commit()
+            await tag_catalog.invalidate()
+            await tag_autocomplete.update([("upsert", new_tag.uid, new_tag.name)])
             return new_tag
         except Exception as e:
             await session.rollback()
@@ -117,18 +246,29 @@ class TagService:
 
     async def update_tag(self, tag_uid: str, tag_update_data: TagCreateModel, session: AsyncSession) -> Tag:
         """
-        Update a tag's information.
+        Update a tag's information with a single UPDATE ... RETURNING.
         """
         try:
-            tag = await self.get_tag_by_uid(tag_uid, session)
-            update_data = tag_update_data.model_dump()
-
-            for field, value in update_data.items():
-                setattr(tag, field, value)
+            statement = (
+                update(Tag)
+                .where(Tag.uid == tag_uid)
+                .values(**tag_update_data.model_dump())
+                .returning(Tag)
+            )
+            result = await session.exec(statement)
+            tag = result.scalar_one_or_none()
+            if not tag:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Tag with UID {tag_uid} not found.",
+                )
 
-            session.add(tag)
+            # Book details embed tag names
+            tagged_book_uids = await self._touch_tagged_books(tag.uid, session)
             await session.commit()
-            await session.refresh(tag)
+            await book_cache.invalidate(*tagged_book_uids)
+            await tag_catalog.invalidate()
+            await tag_autocomplete.update([("upsert", tag.uid, tag.name)])
             return tag
         except HTTPException:
             raise
@@ -141,18 +281,31 @@ class TagService:
 
     async def delete_tag(self, tag_uid: str, session: AsyncSession) -> None:
         """
-        Delete a tag by its unique identifier.
+        Delete a tag by its unique identifier with a single DELETE ... RETURNING.
+
+        The foreign key removes the tag's links to books.
         """
         try:
-            tag = await self.get_tag_by_uid(tag_uid, session)
-            if not tag:
+            # Bump the tagged books' versions while the links still exist
+            tagged_book_uids = await self._touch_tagged_books(tag_uid, session)
+            if session.bind.dialect.name != "postgresql":
+                # SQLite only applies foreign key actions when they are enabled per connection
+                await session.exec(delete(BookTag).where(BookTag.tag_id == tag_uid))
+
+            result = await session.exec(
+                delete(Tag).where(Tag.uid == tag_uid).returning(Tag.uid))
+            if not result.scalar_one_or_none():
+                await session.rollback()
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Tag with UID {tag_uid} not found.",
                 )
 
-            await session.delete(tag)
             await session.commit()
+            await book_cache.invalidate(*tagged_book_uids)
+            await tag_catalog.invalidate()
+            await tag_autocomplete.update([("remove", tag_uid)])
+            await book_tag_index.update([("remove_tag", tag_uid)])
         except HTTPException:
             raise
         except Exception as e:
@@ -161,3 +314,136 @@ class TagService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete the tag.",
             ) from e
+
+    async def _touch_tagged_books(self, tag_uid, session: AsyncSession) -> list[str]:
+        """
+        Bump the version of every book linked to a tag and return their UIDs. The
+        books are locked in uid order first, like `bulk_add_tags` does.
+        """
+        result = await session.exec(
+            select(Book.uid)
+            .where(Book.uid.in_(select(BookTag.book_id).where(BookTag.tag_id == tag_uid)))
+            .order_by(Book.uid)
+            .with_for_update()
+        )
+        book_uids = result.all()
+        if book_uids:
+            await session.exec(
+                update(Book).where(Book.uid.in_(book_uids)).values(version=Book.version + 1))
+        return [str(book_uid) for book_uid in book_uids]
+
+    async def _resolve_tags(
+        self, names: Iterable[str], session: AsyncSession
+    ) -> Tuple[Dict[str, uuid.UUID], Dict[str, uuid.UUID]]:
+        """
+        Map tag names to UIDs, creating the missing tags, in the caller's transaction.
+        Also returns the names and UIDs of the tags it created.
+
+        Missing tags are created by one INSERT ... ON CONFLICT (name) DO NOTHING
+        RETURNING; names it skipped already existed and are read with one SELECT.
+        The rows are inserted in name order, so concurrent transactions creating the
+        same tags wait on each other's inserts in the same order rather than deadlock.
+        """
+        names = sorted(set(names))
+        if not names:
+            return {}, {}
+
+        now = datetime.utcnow()
+        statement = (
+            _insert(session, Tag)
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Tag.name, Tag.uid)
+        )
+        result = await session.execute(statement, [
+            {"uid": uuid.uuid4(), "name": name, "created_at": now, "updated_at": now}
+            for name in names
+        ])
+        created = dict(result.all())
+        tag_uids = dict(created)
+
+        existing = set(names) - tag_uids.keys()
+        if existing:
+            result = await session.exec(select(Tag.name, Tag.uid).where(Tag.name.in_(existing)))
+            tag_uids.update(result.all())
+        return tag_uids, created
+
+    async def _link_tags(
+        self, links: Set[Tuple[uuid.UUID, uuid.UUID]], session: AsyncSession
+    ) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Insert (book, tag) links in one multi-row statement, skipping existing links.
+        Returns the links that were added.
+
+        Links are inserted in sorted order, for the same reason as new tags.
+        """
+        if not links:
+            return []
+        result = await session.execute(
+            _insert(session, BookTag)
+            .on_conflict_do_nothing()
+            .returning(BookTag.book_id, BookTag.tag_id),
+            [{"book_id": book_uid, "tag_id": tag_uid} for book_uid, tag_uid in sorted(links)],
+        )
+        return [tuple(link) for link in result.all()]
+
+    async def _book_tags(
+        self, book_uids: Set[uuid.UUID], session: AsyncSession
+    ) -> Dict[uuid.UUID, Set[uuid.UUID]]:
+        """Map each book to the UIDs of all its tags, in one query."""
+        if not book_uids:
+            return {}
+        result = await session.exec(
+            select(BookTag.book_id, BookTag.tag_id).where(BookTag.book_id.in_(book_uids)))
+        book_tags: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        for book_uid, tag_uid in result.all():
+            book_tags.setdefault(book_uid, set()).add(tag_uid)
+        return book_tags
+
+    async def _tags_linked(
+        self,
+        created: Dict[str, uuid.UUID],
+        linked: List[Tuple[uuid.UUID, uuid.UUID]],
+        book_tags: Dict[uuid.UUID, Set[uuid.UUID]],
+        created_at: Dict[uuid.UUID, datetime],
+    ) -> None:
+        """
+        Bring the tag catalog, the autocomplete index, the book tag index and the
+        related tags up to date after tags were created or linked to books.
+        `created_at` maps the tagged books to their creation time.
+        """
+        if created:
+            await tag_catalog.invalidate()
+        await tag_autocomplete.update(
+            [("upsert", tag_uid, name) for name, tag_uid in created.items()]
+            + [("usage", tag_uid, count)
+               for tag_uid, count in Counter(tag_uid for _, tag_uid in linked).items()]
+        )
+        new_links: Dict[uuid.UUID, List[uuid.UUID]] = {}
+        for book_uid, tag_uid in linked:
+            new_links.setdefault(book_uid, []).append(tag_uid)
+        await book_tag_index.update(
+            [("link", book_uid, created_at[book_uid], tag_uids) for book_uid, tag_uids in new_links.items()])
+        await record_links(book_tags, linked)
+
+    async def _infix_suggestions(
+        self, text: str, limit: int, exclude: Set[uuid.UUID], session: AsyncSession
+    ) -> list:
+        """
+        Find tags whose name contains `text` but are not in `exclude`.
+
+        On PostgreSQL the ILIKE is served by the trigram index on tags.name and the
+        closest matches are kept; elsewhere the autocomplete index is scanned.
+        """
+        if session.bind.dialect.name != "postgresql":
+            return tag_autocomplete.contains(text, limit, exclude)
+
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        statement = (
+            select(Tag.uid, Tag.name)
+            .where(Tag.name.ilike(pattern, escape="\\"), Tag.uid.not_in(exclude))
+            .order_by(func.similarity(Tag.name, text).desc())
+            .limit(limit)
+        )
+        result = await session.exec(statement)
+        suggestions = [(uid, name, tag_autocomplete.book_count(uid)) for uid, name in result.all()]
+        return sorted(suggestions, key=lambda suggestion: -suggestion[2])
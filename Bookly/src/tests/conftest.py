@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# The application imports its packages relative to src/ (e.g. `from conf.config import settings`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Modules that build the async engine, the Redis client or the token serializer at
+# import time need settings; nothing connects until used
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
@@ -0,0 +1,134 @@
+import asyncio
+import fnmatch
+
+from redis.exceptions import ConnectionError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+class FakeRedis:
+    """In-memory stand-in for the parts of a Redis client the broadcasts, the
+    blocklist and the caches use."""
+
+    def __init__(self):
+        self.queues = []
+        self.values = {}
+        self.sorted_sets = {}
+        self.exists_calls = 0
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def mget(self, *keys):
+        return [self.values.get(key) for key in keys]
+
+    async def set(self, name, value, ex=None):
+        self.values[name] = str(value)
+
+    async def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        self.exists_calls += 1
+        return int(key in self.values)
+
+    async def scan_iter(self, match=None, count=None):
+        for key in list(self.values):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def publish(self, channel, message):
+        for subscribed, queue in self.queues:
+            if subscribed == channel:
+                queue.put_nowait(message)
+
+    def pubsub(self, **kwargs):
+        return FakePubSub(self)
+
+    def disconnect(self):
+        for _, queue in self.queues:
+            queue.put_nowait(ConnectionError("connection lost"))
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.results = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def set(self, name, value, ex=None, nx=False):
+        if not (nx and name in self.client.values):
+            self.client.values[name] = str(value)
+        self.results.append(True)
+
+    def get(self, name):
+        self.results.append(self.client.values.get(name))
+
+    def delete(self, *names):
+        self.results.append(sum(self.client.values.pop(name, None) is not None for name in names))
+
+    def incr(self, name):
+        self.client.values[name] = str(int(self.client.values.get(name, 0)) + 1)
+        self.results.append(int(self.client.values[name]))
+
+    def zadd(self, name, mapping):
+        self.client.sorted_sets.setdefault(name, {}).update(mapping)
+        self.results.append(len(mapping))
+
+    def zremrangebyscore(self, name, low, high):
+        members = self.client.sorted_sets.get(name, {})
+        expired = [member for member, score in members.items() if score <= float(high)]
+        for member in expired:
+            del members[member]
+        self.results.append(len(expired))
+
+    def zrangebyscore(self, name, low, high):
+        members = self.client.sorted_sets.get(name, {})
+        self.results.append([member for member, score in members.items() if score >= float(low)])
+
+    async def execute(self):
+        return self.results
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+        self.entry = None
+
+    async def subscribe(self, channel):
+        self.entry = (channel, asyncio.Queue())
+        self.client.queues.append(self.entry)
+
+    async def listen(self):
+        while True:
+            message = await self.entry[1].get()
+            if isinstance(message, Exception):
+                raise message
+            yield {"type": "message", "data": message}
+
+    async def aclose(self):
+        if self.entry in self.client.queues:
+            self.client.queues.remove(self.entry)
+
+
+async def session_factory():
+    """Session factory over a fresh in-memory SQLite database with every table."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    # SQLite only enforces foreign keys when asked to
+    event.listen(engine.sync_engine, "connect",
+                 lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
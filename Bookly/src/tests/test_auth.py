@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+import uuid
+
+from sqlalchemy import event
+
+from auth import services
+from auth.models import User
+from auth.principals import PrincipalCache
+from conf.blocklist import REVOKED_CHANNEL, REVOKED_KEY, RevokedJtiFilter
+from fakes import FakeRedis, session_factory
+
+
+def test_revoked_jti_filter_defers_to_redis_while_unsubscribed():
+    async def scenario():
+        client = FakeRedis()
+        revoked = RevokedJtiFilter(capacity=1000, fp_rate=0.001, rebuild_interval=60, client=client)
+        await revoked.start()
+        await asyncio.sleep(0.01)
+        assert revoked.ready
+        assert not revoked.might_contain(str(uuid.uuid4()))
+
+        client.disconnect()
+        await asyncio.sleep(0.01)
+        assert not revoked.ready
+
+        # A periodic rebuild falls due while the listener waits to resubscribe, and
+        # another worker revokes a token whose broadcast nobody receives
+        revoked._seeded_at -= 60
+        jti = str(uuid.uuid4())
+        client.values[jti] = "1"
+        client.sorted_sets.setdefault(REVOKED_KEY, {})[jti] = time.time() + 3600
+        await client.publish(REVOKED_CHANNEL, json.dumps({"origin": "other", "payload": jti}))
+        assert revoked.might_contain(jti)
+        await asyncio.sleep(0.01)
+        assert not revoked.ready
+        assert revoked.might_contain(jti)
+
+        # Resubscribing reseeds the filter from Redis
+        await asyncio.sleep(1.1)
+        assert revoked.ready
+        assert revoked.might_contain(jti)
+        assert not revoked.might_contain(str(uuid.uuid4()))
+        await revoked.stop()
+
+    asyncio.run(scenario())
+
+
+def test_principal_lookups_share_one_query_until_invalidated(monkeypatch):
+    async def scenario():
+        factory = await session_factory()
+        async with factory() as session:
+            user = User(username="reader", email="reader@example.com", first_name="Read",
+                        last_name="Er", role="user", password_hash="x")
+            session.add(user)
+            await session.commit()
+
+        client = FakeRedis()
+        cache = PrincipalCache(maxsize=100, ttl=30, redis_ttl=300, client=client)
+        monkeypatch.setattr(services, "principal_cache", cache)
+        principal_queries = []
+        event.listen(
+            factory.kw["bind"].sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: principal_queries.append(statement)
+            if "FROM users" in statement and "password_hash" not in statement else None,
+        )
+        auth_service = services.AuthService()
+
+        async with factory() as session:
+            principals = [await auth_service.get_principal(user.uid, session) for _ in range(101)]
+        assert len(principal_queries) == 1
+        assert {principal.role for principal in principals} == {"user"}
+
+        # Another worker finds the principal in Redis
+        other = PrincipalCache(maxsize=100, ttl=30, redis_ttl=300, client=client)
+        assert (await other.get(str(user.uid)))[0] == principals[0]
+
+        async with factory() as session:
+            stored = await session.get(User, user.uid)
+            await auth_service.update_user(stored, {"role": "admin"}, session)
+            assert (await auth_service.get_principal(user.uid, session)).role == "admin"
+        assert len(principal_queries) == 2
+        # The other worker's Redis lookup now misses; only its local copy lags
+        other.local.clear()
+        assert (await other.get(str(user.uid)))[0].role == "admin"
+
+    asyncio.run(scenario())
@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import io
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from auth.models import User
+from books import export
+from books.loading import book_load_options
+from books.models import Book, Tag
+from reviews.models import Review
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = User(
+            username="reader",
+            email="reader@example.com",
+            first_name="Read",
+            last_name="Er",
+            role="user",
+            password_hash="x",
+        )
+        tags = [Tag(name="fiction"), Tag(name="classic")]
+        session.add(user)
+        session.add_all(tags)
+        for i in range(5):
+            book = Book(
+                title=f"Book {i}",
+                author="Author",
+                publisher="Publisher",
+                published_date=date(2020, 1, 1),
+                page_count=100,
+                language="en",
+                user=user,
+                tags=tags,
+            )
+            session.add(book)
+            for rating in (3, 5):
+                session.add(Review(rating=rating, review_text="ok", user=user, book=book))
+        session.commit()
+
+    return engine
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: executed.append(statement),
+    )
+    return executed
+
+
+def test_list_profile_is_a_single_query(engine, statements):
+    with Session(engine) as session:
+        books = session.exec(
+            select(Book).options(*book_load_options("list"))).all()
+
+        assert len(books) == 5
+        assert len(statements) == 1
+
+        with pytest.raises(InvalidRequestError):
+            books[0].reviews
+
+
+def test_detail_profile_loads_reviews_and_tags_only(engine, statements):
+    with Session(engine) as session:
+        book = session.exec(
+            select(Book).where(Book.title == "Book 0").options(*book_load_options("detail"))).one()
+
+        assert len(book.reviews) == 2
+        assert {tag.name for tag in book.tags} == {"fiction", "classic"}
+        # One query for the book, one per eager-loaded collection
+        assert len(statements) == 3
+
+        with pytest.raises(InvalidRequestError):
+            book.tags[0].books
+        with pytest.raises(InvalidRequestError):
+            book.user
+
+
+def test_relationships_are_not_loaded_by_default(engine, statements):
+    with Session(engine) as session:
+        tags = session.exec(select(Tag)).all()
+
+        assert len(tags) == 2
+        assert len(statements) == 1
+
+        with pytest.raises(InvalidRequestError):
+            tags[0].books
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(KeyError):
+        book_load_options(str(uuid.uuid4()))
+
+
+def test_csv_export_writes_every_selected_column(monkeypatch):
+    columns = [column.key for column in export._export_statement().selected_columns]
+    assert columns == export.EXPORT_FIELDS
+
+    async def rows():
+        yield [{**dict.fromkeys(columns, "x"), "tags": ["fiction", "classic"]}]
+
+    async def collect():
+        return "".join([chunk async for chunk in export.iter_csv()])
+
+    monkeypatch.setattr(export, "stream_book_rows", rows)
+    records = list(csv.DictReader(io.StringIO(asyncio.run(collect()))))
+
+    assert len(records) == 1
+    assert records[0]["title"] == "x"
+    assert records[0]["tags"] == "fiction|classic"
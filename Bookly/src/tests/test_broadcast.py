@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from conf.broadcast import Broadcast
+from fakes import FakeRedis
+
+
+def test_listener_survives_bad_messages():
+    async def scenario():
+        client = FakeRedis()
+        received = []
+
+        def on_message(payload):
+            if payload == "boom":
+                raise RuntimeError("handler failed")
+            received.append(payload)
+
+        broadcast = Broadcast("test", on_message=on_message, on_reset=lambda: None, client=client)
+        await broadcast.start()
+        await asyncio.sleep(0)
+
+        await client.publish("test", "{not json")
+        await client.publish("test", json.dumps({"origin": "other", "payload": "boom"}))
+        await client.publish("test", json.dumps({"origin": "other", "payload": "ok"}))
+        await asyncio.sleep(0.01)
+
+        assert received == ["ok"]
+        assert broadcast.subscribed
+        await broadcast.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import func, select
+
+from auth.models import User
+from books.models import Book
+from books.services import book_cache
+from reviews.ingest import BOOK_NOT_FOUND, WRITE_FAILED, ReviewIngestor
+from reviews.models import Review
+from reviews.schemas import ReviewCreateModel
+from reviews.services import rating_histogram_cache, review_list_version
+from fakes import FakeRedis, session_factory
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeRedis()
+    for cache in (book_cache, rating_histogram_cache, review_list_version):
+        monkeypatch.setattr(cache, "client", client)
+    return client
+
+
+async def seed(factory, books: int):
+    async with factory() as session:
+        user = User(username="reader", email="reader@example.com", first_name="Read",
+                    last_name="Er", role="user", password_hash="x")
+        session.add(user)
+        rows = [Book(title=f"Book {i}", author="Author", publisher="Publisher",
+                     published_date=date(2020, 1, 1), page_count=100, language="en")
+                for i in range(books)]
+        session.add_all(rows)
+        await session.commit()
+        return user.uid, [book.uid for book in rows]
+
+
+def test_ingest_isolates_rejected_and_failing_reviews(client):
+    async def scenario():
+        factory = await session_factory()
+        user_uid, (first, second) = await seed(factory, 2)
+        ingestor = ReviewIngestor(queue_size=100, batch_size=100, flush_interval=0.05,
+                                  status_ttl=60, session_factory=factory, client=client)
+        await ingestor.start()
+
+        def submit(book_uid, rating, reviewer=user_uid):
+            review = ReviewCreateModel(rating=rating, review_text="ok")
+            return ingestor.submit(reviewer, book_uid, review, wait=True)
+
+        missing_book, unknown_user = uuid.uuid4(), uuid.uuid4()
+        results = await asyncio.gather(
+            submit(first, 4), submit(first, 5), submit(missing_book, 3), submit(second, 2),
+            submit(first, 3, reviewer=unknown_user), submit(first, 3),
+            return_exceptions=True,
+        )
+        await ingestor.stop()
+
+        assert [result["status"] for i, result in enumerate(results) if i not in (2, 4)] == ["stored"] * 4
+        assert results[2].status_code == 404 and results[2].detail == BOOK_NOT_FOUND
+        assert results[4].status_code == 500 and results[4].detail == WRITE_FAILED
+        # All six were written as one batch, then split to isolate the failing row
+        assert ingestor.batches == 1
+        assert (ingestor.stored, ingestor.rejected, ingestor.failed) == (4, 1, 1)
+
+        async with factory() as session:
+            aggregates = dict((uid, (count, total)) for uid, count, total in (await session.exec(
+                select(Book.uid, Book.review_count, Book.rating_sum))).all())
+            assert aggregates == {first: (3, 12), second: (1, 2)}
+            assert (await session.exec(select(func.count()).select_from(Review))).one() == 4
+        # Both rejections are recorded for status lookups
+        assert sorted(client.values[key] for key in client.values if key.startswith("review_ingest:")) \
+            == [BOOK_NOT_FOUND, WRITE_FAILED]
+
+    asyncio.run(scenario())
+
+
+def test_stop_settles_reviews_left_in_the_queue(client, monkeypatch):
+    async def scenario():
+        factory = await session_factory()
+        user_uid, (book_uid,) = await seed(factory, 1)
+        ingestor = ReviewIngestor(queue_size=100, batch_size=1, flush_interval=0,
+                                  status_ttl=60, session_factory=factory, client=client)
+
+        async def stuck(batch):
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(ingestor, "_flush", stuck)
+        await ingestor.start()
+        review = ReviewCreateModel(rating=5, review_text="ok")
+        waiting = [asyncio.create_task(ingestor.submit(user_uid, book_uid, review, wait=True))
+                   for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await ingestor.stop(timeout=0.01)
+
+        for task in waiting:
+            with pytest.raises(HTTPException) as raised:
+                await asyncio.wait_for(task, 1)
+            assert raised.value.detail == WRITE_FAILED
+        assert ingestor.failed == 3
+
+    asyncio.run(scenario())
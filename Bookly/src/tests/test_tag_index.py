@@ -0,0 +1,91 @@
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from books.tag_index import BookTagIndex
+from fakes import FakeRedis
+
+START = datetime(2026, 1, 1)
+
+
+def brute_force(books, required, excluded, limit, before=None):
+    matches = sorted(
+        (key for key, tag_uids in books.values()
+         if set(required) <= tag_uids and not set(excluded) & tag_uids),
+        reverse=True)
+    return [key for key in matches if before is None or key < before][:limit], len(matches)
+
+
+def random_library(rng, n_books, tags):
+    books = {}
+    for i in range(n_books):
+        book_uid = uuid.uuid4()
+        # Tags range from on most books, kept as bitmaps, to on a handful
+        tagged = {tag_uid for rank, tag_uid in enumerate(tags) if rng.random() < 0.6 / (rank + 1)}
+        books[book_uid] = ((START + timedelta(seconds=i // 2), book_uid), tagged)
+    return books
+
+
+def loaded_index(books):
+    index = BookTagIndex(max_age=3600, client=FakeRedis())
+    index._build(sorted(key for key, _ in books.values()),
+                 [(tag_uid, book_uid) for book_uid, (_, tag_uids) in books.items() for tag_uid in tag_uids])
+    index._loaded_at = time.monotonic()
+    return index
+
+
+def assert_matches_brute_force(index, books, tags, rng, queries=300):
+    for _ in range(queries):
+        chosen = rng.sample(tags, rng.randint(1, 4))
+        split = rng.randint(1, len(chosen))
+        required, excluded = chosen[:split], chosen[split:]
+        limit = rng.choice([1, 5, 20, 1000])
+        before = None
+        if rng.random() < 0.5:
+            before = rng.choice(list(books.values()))[0]
+        assert index.query(required, excluded, limit, before) == \
+            brute_force(books, required, excluded, limit, before)
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(7)
+    tags = [uuid.uuid4() for _ in range(12)]
+    books = random_library(rng, 3000, tags)
+    index = loaded_index(books)
+
+    assert index.stats()["dense_tags"] > 0
+    assert_matches_brute_force(index, books, tags, rng)
+    assert index.query([uuid.uuid4()], [], 10) == ([], 0)
+
+
+def test_incremental_updates_keep_the_index_loaded():
+    async def scenario():
+        rng = random.Random(11)
+        tags = [uuid.uuid4() for _ in range(8)]
+        books = random_library(rng, 1000, tags)
+        index = loaded_index(books)
+
+        # New books, tagged out of creation order, and more tags on existing books
+        newest = max(key for key, _ in books.values())[0]
+        new_books = [uuid.uuid4() for _ in range(40)]
+        created = {book_uid: newest + timedelta(seconds=rng.randint(-500, 500)) for book_uid in new_books}
+        for book_uid in rng.sample(new_books, len(new_books)) + rng.sample(list(books), 50):
+            tag_uids = set(rng.sample(tags, rng.randint(1, 3)))
+            key = books[book_uid][0] if book_uid in books else (created[book_uid], book_uid)
+            books.setdefault(book_uid, (key, set()))[1].update(tag_uids)
+            await index.update([("link", book_uid, key[0], tag_uids)])
+        assert index.stats()["tail_books"] > 0
+
+        removed_book = rng.choice(new_books)
+        removed_tag = tags[-1]
+        await index.update([("remove_book", removed_book), ("remove_tag", removed_tag)])
+        del books[removed_book]
+        for _, tag_uids in books.values():
+            tag_uids.discard(removed_tag)
+
+        assert index.loaded
+        assert_matches_brute_force(index, books, tags[:-1], rng)
+
+    asyncio.run(scenario())